@@ -0,0 +1,34 @@
+from random import randrange
+
+from asgiref.sync import sync_to_async
+
+from main_project.sharding import get_async_otp_redis
+from .utils import check_otp, token_generator
+
+
+async def aset_otp_in_redis(mobile, otp, expiration):
+    await get_async_otp_redis().set(f'otp:{mobile}', otp, shard_key=mobile, ex=expiration)
+
+
+async def auser_send_otp_code(mobile, expiration=2*60):
+    from authentication.tasks import kavenegar_sms_task
+
+    otp = randrange(10000, 99999)
+    await sync_to_async(kavenegar_sms_task.apply_async, thread_sensitive=False)(args=[mobile, otp])
+    await aset_otp_in_redis(mobile, otp, expiration)
+    return True
+
+
+async def auser_verify_otp(mobile, otp, set_again_in_redis=True, new_expiration=10*60):
+    get_code = await get_async_otp_redis().get(f'otp:{mobile}', shard_key=mobile)
+    check_otp(get_code, otp)
+    if set_again_in_redis:
+        await aset_otp_in_redis(mobile, otp, expiration=new_expiration)
+
+
+async def adelete_otp_from_redis(mobile):
+    await get_async_otp_redis().delete(f'otp:{mobile}', shard_key=mobile)
+
+
+async def atoken_generator(user):
+    return await sync_to_async(token_generator, thread_sensitive=False)(user)
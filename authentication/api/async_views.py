@@ -0,0 +1,140 @@
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, MethodNotAllowed, ParseError, Throttled
+
+from authentication.audit import arecord_event, submitted_identifier
+from authentication.models import User, AuthAuditEvent
+from main_project.connections import close_async_redis
+from main_project.sharding import close_async_otp_redis
+from .serializers import (
+    SendOtpSerializer,
+    VerifyOtpSerializer,
+    LogInByOtpSerializer,
+)
+from .async_utils import (
+    auser_send_otp_code,
+    auser_verify_otp,
+    adelete_otp_from_redis,
+    atoken_generator,
+)
+from .throttling import AnonRateThrottle
+
+
+class AsyncAnonRateThrottle(AnonRateThrottle):
+    # every caller of these views is anonymous, skip the lazy request.user
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+def parse_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise ParseError()
+    return request.POST
+
+
+def async_api_view(throttle=False):
+    """
+    Turn a coroutine into a POST-only, csrf exempt JSON view that renders
+    APIExceptions the way DRF does. Django 3.2 decorators such as
+    csrf_exempt wrap async views into sync ones, hence the attribute.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            try:
+                if request.method != 'POST':
+                    raise MethodNotAllowed(request.method)
+                if throttle:
+                    throttle_instance = AsyncAnonRateThrottle()
+                    if not await sync_to_async(throttle_instance.allow_request)(request, None):
+                        raise Throttled(throttle_instance.wait())
+                return await view(request, parse_data(request), *args, **kwargs)
+            except APIException as exc:
+                detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+                response = JsonResponse(detail, status=exc.status_code, safe=False)
+                if getattr(exc, 'wait', None):
+                    response['Retry-After'] = '%d' % exc.wait
+                return response
+            finally:
+                if not isinstance(request, ASGIRequest):
+                    # through WSGI every request runs in an event loop of
+                    # its own, its Redis connections would be left open
+                    await close_async_redis()
+                    await close_async_otp_redis()
+        wrapped.csrf_exempt = True
+        return wrapped
+    return decorator
+
+
+@async_api_view(throttle=True)
+async def send_otp_view(request, data):
+    mobile = SendOtpSerializer().to_internal_value(data)['mobile']
+    exists = await sync_to_async(User.objects.filter(mobile__iexact=mobile).exists)()
+    SendOtpSerializer.check_account(exists, request.GET.get('has_account'))
+    await auser_send_otp_code(mobile=mobile, expiration=60*2)
+    await arecord_event(AuthAuditEvent.OTP_SENT, request, identifier=mobile)
+    return JsonResponse(
+        {'detail': 'otp code has been sent successfully.'},
+        status=status.HTTP_201_CREATED
+    )
+
+
+@async_api_view()
+async def verify_otp_view(request, data):
+    try:
+        validated_data = VerifyOtpSerializer().to_internal_value(data)
+        await auser_verify_otp(validated_data['mobile'], validated_data['otp'])
+    except APIException as exc:
+        await arecord_event(
+            AuthAuditEvent.OTP_FAILED,
+            request,
+            identifier=submitted_identifier(data, 'mobile'),
+            reason=type(exc).__name__,
+        )
+        raise
+    await arecord_event(AuthAuditEvent.OTP_VERIFIED, request, identifier=validated_data['mobile'])
+    return JsonResponse(
+        {'detail': 'otp code verified.'},
+        status=status.HTTP_200_OK
+    )
+
+
+@async_api_view(throttle=True)
+async def login_by_otp_view(request, data):
+    user = None
+    try:
+        validated_data = LogInByOtpSerializer().to_internal_value(data)
+        mobile = validated_data['mobile']
+        user = await sync_to_async(User.objects.filter(mobile__iexact=mobile).first)()
+        LogInByOtpSerializer.check_user(user)
+        await auser_verify_otp(
+            mobile=mobile,
+            otp=validated_data['otp'],
+            set_again_in_redis=False
+        )
+    except APIException as exc:
+        await arecord_event(
+            AuthAuditEvent.LOGIN_FAILED,
+            request,
+            user=user,
+            identifier=submitted_identifier(data, 'mobile'),
+            reason=type(exc).__name__,
+        )
+        raise
+    await adelete_otp_from_redis(mobile)
+    await arecord_event(AuthAuditEvent.LOGIN_OTP, request, user=user, identifier=mobile)
+    return JsonResponse(
+        {'JWT token': await atoken_generator(user)},
+        status=status.HTTP_200_OK
+    )
@@ -0,0 +1,32 @@
+import jwt
+from django.http import HttpResponse
+from rest_framework_jwt.settings import api_settings
+
+from authentication.models import User
+
+
+def unauthorized():
+    response = HttpResponse(status=401)
+    response['WWW-Authenticate'] = api_settings.JWT_AUTH_HEADER_PREFIX
+    return response
+
+
+def auth_request(request):
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(auth) != 2 or auth[0].lower() != api_settings.JWT_AUTH_HEADER_PREFIX.lower():
+        return unauthorized()
+
+    try:
+        payload = api_settings.JWT_DECODE_HANDLER(auth[1])
+    except jwt.InvalidTokenError:
+        return unauthorized()
+
+    username = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload)
+    user = User.objects.filter(username=username).values_list('id', 'username').first()
+    if user is None:
+        return unauthorized()
+
+    response = HttpResponse(status=200)
+    response['X-User-Id'] = str(user[0])
+    response['X-User-Username'] = user[1]
+    return response
@@ -0,0 +1,68 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+
+from authentication.models import User
+from main_project.db_router import pin_recent_writer
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    Basic authentication that remembers a keyed digest of verified
+    credentials for a short time, so repeated calls skip the password hasher.
+    """
+    cache_prefix = 'basic_auth:'
+
+    def get_cache_key(self, userid, password):
+        digest = hmac.new(
+            settings.SECRET_KEY.encode(),
+            '{}:{}'.format(userid, password).encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return self.cache_prefix + digest
+
+    def get_password_fingerprint(self, user):
+        return hashlib.sha256(user.password.encode()).hexdigest()[:16]
+
+    def authenticate_credentials(self, userid, password, request=None):
+        key = self.get_cache_key(userid, password)
+        cached = cache.get(key)
+        if cached is not None:
+            user = User.objects.filter(pk=cached[0]).first()
+            # a password change invalidates the cached credentials
+            if user is not None and user.is_active and self.get_password_fingerprint(user) == cached[1]:
+                return user, None
+            cache.delete(key)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache.set(
+            key,
+            (user.pk, self.get_password_fingerprint(user)),
+            settings.BASIC_AUTH_CACHE_TTL,
+        )
+        return user, auth
+
+
+class PinningJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JWT authentication that pins the request to the primary before the
+    user is loaded, when that user wrote recently from any client.
+    """
+    def authenticate_credentials(self, payload):
+        user_id = payload.get('user_id')
+        if user_id is not None:
+            pin_recent_writer(user_id)
+        return super().authenticate_credentials(payload)
+
+
+# authentication profiles, applied per view group with @authentication_classes
+ANONYMOUS_AUTHENTICATION = []
+JWT_AUTHENTICATION = [PinningJSONWebTokenAuthentication]
+SESSION_AUTHENTICATION = [SessionAuthentication]
+BASIC_AUTHENTICATION = [CachedBasicAuthentication]
+# staff-only endpoints also serve scripts and cron jobs, which send Basic credentials
+STAFF_AUTHENTICATION = JWT_AUTHENTICATION + BASIC_AUTHENTICATION
@@ -57,3 +57,8 @@ class IncorrectOTPException(APIException):
 class DirtyContentException(APIException):
     status_code = status.HTTP_400_BAD_REQUEST
     default_detail = _('not proper content.')
+
+
+class InvalidExportParameterException(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _('invalid export parameter.')
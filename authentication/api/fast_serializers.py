@@ -0,0 +1,68 @@
+from urllib.parse import quote
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+
+SLUG_PLACEHOLDER = '{slug}'
+
+
+class FastUserListSerializer:
+    """
+    Builds the UserSerializer output from `.values()` rows. The profile
+    url is formatted from a template reversed once per response instead of
+    calling reverse() for every row, and the avatar comes from the same
+    query instead of one profile query per row.
+    """
+    fields = ('slug', 'username', 'first_name', 'last_name', 'profile__avatar')
+
+    def __init__(self, request):
+        # the braces come back percent-encoded, which no slug, host or
+        # script prefix contains
+        url = request.build_absolute_uri(reverse('profile', kwargs={'slug': SLUG_PLACEHOLDER}))
+        self.url_prefix, self.url_suffix = url.rsplit(quote(SLUG_PLACEHOLDER), 1)
+        self.media_prefix = request.build_absolute_uri(settings.MEDIA_URL)
+
+    def to_representation(self, rows):
+        url_prefix, url_suffix, media_prefix = self.url_prefix, self.url_suffix, self.media_prefix
+        return [
+            {
+                'url': url_prefix + quote(row['slug']) + url_suffix,
+                'slug': row['slug'],
+                'username': row['username'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'avatar': media_prefix + filepath_to_uri(row['profile__avatar']) if row['profile__avatar'] else None,
+            }
+            for row in rows
+        ]
+
+
+class FastProfileSerializer:
+    fields = (
+        'id', 'gender', 'birthday', 'avatar', 'about_me', 'updated_at',
+        'user_id', 'user__username', 'user__first_name', 'user__last_name',
+    )
+    date_field = serializers.DateField()
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, request):
+        self.media_prefix = request.build_absolute_uri(settings.MEDIA_URL)
+        self.logged_user_id = request.user.pk if request.user.is_authenticated else None
+
+    def to_representation(self, row):
+        data = {
+            'id': row['id'],
+            'username': row['user__username'],
+            'first_name': row['user__first_name'],
+            'last_name': row['user__last_name'],
+            'gender': row['gender'],
+            'birthday': self.date_field.to_representation(row['birthday']) if row['birthday'] else None,
+            'avatar': self.media_prefix + filepath_to_uri(row['avatar']) if row['avatar'] else None,
+            'updated_at': self.datetime_field.to_representation(row['updated_at']),
+        }
+        if row['user_id'] == self.logged_user_id:
+            data['about_me'] = row['about_me']
+        return data
@@ -0,0 +1,17 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    # orjson handles the common types natively and falls back to DRF's
+    # encoder for lazy strings, decimals and the like. Dates and times are
+    # passed through to it as well, for DRF's output: milliseconds and a
+    # Z suffix for UTC
+    encoder = JSONEncoder()
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self.encoder.default, option=self.options)
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.db.models import Q
-from django.contrib.auth import authenticate
+from django.utils.timezone import now
 
-from authentication.models import User, Profile
+from authentication.models import User, Profile, AuthAuditEvent
+from main_project.db_router import pin_to_primary
+from main_project.metrics import timed
 from .regex_validators import (
     username_format,
     mobile_format,
@@ -29,15 +31,17 @@ class SendOtpSerializer(serializers.Serializer):
         regex=mobile_format,
     )
 
+    @staticmethod
+    def check_account(exists, has_account):
+        # shared with the async send_otp view, which looks the mobile up itself
+        if has_account and not exists:
+            raise IncorrectMobileException()
+        if not has_account and exists:
+            raise UserExistException()
+
     def validate(self, data):
-        has_account = self.context.get('has_account', False)
-        user = User.objects.filter(mobile__iexact=data['mobile'])
-        if has_account:
-            if not user.exists():
-                raise IncorrectMobileException()
-        else:
-            if user.exists():
-                raise UserExistException()
+        exists = User.objects.filter(mobile__iexact=data['mobile']).exists()
+        self.check_account(exists, self.context.get('has_account', False))
         return data
 
 
@@ -104,22 +108,27 @@ class UserSignUpSerializer(serializers.Serializer):
             username=data['username'],
             password=data['password'],
         )
+        pin_to_primary(user)
         return user
 
 
 class LogInByOtpSerializer(VerifyOtpSerializer):
-    BLOCKED_STATUS = 3
+    BLOCKED_STATUS = User.BLOCKED_STATUS
 
-    def get_user(self, mobile):
-        user = User.objects.filter(mobile__iexact=mobile)
-        if not user.exists():
+    @classmethod
+    def check_user(cls, user):
+        # shared with the async login_by_otp view
+        if user is None:
             raise IncorrectMobileException()
-        self.user = user.first()
+        if user.status == cls.BLOCKED_STATUS:
+            raise BlockedException()
+
+    def get_user(self, mobile):
+        self.user = User.objects.filter(mobile__iexact=mobile).first()
+        self.check_user(self.user)
 
     def validate(self, data):
         self.get_user(data['mobile'])
-        if self.user.status == self.BLOCKED_STATUS:
-            raise BlockedException()
         user_verify_otp(
             mobile=data['mobile'],
             otp=data['otp'],
@@ -129,7 +138,7 @@ class LogInByOtpSerializer(VerifyOtpSerializer):
 
 
 class LogInByPasswordSerializer(serializers.Serializer):
-    BLOCKED_STATUS = 3
+    BLOCKED_STATUS = User.BLOCKED_STATUS
 
     mobile_or_email_or_username = serializers.CharField(
         required=True,
@@ -150,8 +159,11 @@ class LogInByPasswordSerializer(serializers.Serializer):
         return self
 
     def authenticate_user(self, password):
-        user = authenticate(mobile=self.user.mobile, password=password)
-        if user is None:
+        # what ModelBackend.authenticate() checks, without looking the user
+        # up a second time, and with only the hasher in the hash span
+        with timed('hash'):
+            valid = self.user.check_password(password)
+        if not valid or not self.user.is_active:
             raise IncorrectMobileEmailUsernameException()
 
     def validate(self, data):
@@ -194,8 +206,10 @@ class ChangeForgetPasswordSerializer(serializers.Serializer):
         return data
 
     def set_password(self):
-        self.user.set_password(self.password)
+        with timed('hash'):
+            self.user.set_password(self.password)
         self.user.save()
+        pin_to_primary(self.user)
 
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -212,8 +226,9 @@ class ChangePasswordSerializer(serializers.Serializer):
 
     def check_user_password(self, request, password):
         user = get_user_from_request(request)
-        user = authenticate(mobile=user.mobile, password=password)
-        if user is None:
+        with timed('hash'):
+            valid = user.check_password(password)
+        if not valid or not user.is_active:
             raise IncorrectPasswordException()
         self.user = user
 
@@ -225,8 +240,10 @@ class ChangePasswordSerializer(serializers.Serializer):
         return data
 
     def set_password(self):
-        self.user.set_password(self.new_password)
+        with timed('hash'):
+            self.user.set_password(self.new_password)
         self.user.save()
+        pin_to_primary(self.user)
 
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
@@ -238,34 +255,6 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name='profile', lookup_field='slug', read_only=True)
 
 
-class GetProfileSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Profile
-        exclude = ['user', 'about_me_status']
-        extra_fields = ['first_name', 'last_name', 'about_user', 'notification']
-
-    about_user = serializers.SerializerMethodField('get_about_user')
-    notification = serializers.SerializerMethodField('get_notification')
-    username = serializers.CharField(source='user.username')
-    first_name = serializers.CharField(source='user.first_name')
-    last_name = serializers.CharField(source='user.last_name')
-
-    def get_about_user(self, obj):
-        if obj.about_me_status == 1:
-            return obj.about_me
-
-    def get_logged_user(self):
-        return get_user_from_request(self.context['request'])
-
-    def get_fields(self):
-        fields = super().get_fields()
-        if self.get_logged_user() != self.instance.user:
-            [fields.pop(i) for i in list(fields) if i in ['url', 'notification', 'about_me']]
-        else:
-            [fields.pop(i) for i in list(fields) if i in ['url', 'about_user']]
-        return fields
-
-
 class UpdateProfileSerializer(serializers.Serializer):
     first_name = serializers.CharField(
         required=False,
@@ -307,19 +296,66 @@ class UpdateProfileSerializer(serializers.Serializer):
                 check_dirty_content(data[field])
         return data
 
-    def update_user(self, user, validated_data):
-        if 'first_name' in validated_data:
-            user.first_name = validated_data.get('first_name')
-        if 'last_name' in validated_data:
-            user.last_name = validated_data.get('last_name')
-        user.save()
+    def update_user(self, user, validated_data, updated_at):
+        fields = {field: validated_data[field] for field in ('first_name', 'last_name') if field in validated_data}
+        # a queryset update, user.save() would save the profile again
+        # through the post_save signal
+        User.objects.filter(pk=user.pk).update(updated_at=updated_at, **fields)
 
     def update(self, obj, validated_data):
         user = obj.user
-        self.update_user(user, validated_data)
+        updated_at = now()
+        self.update_user(user, validated_data, updated_at)
         validated_data = {
             field: validated_data[field] for field in validated_data if field not in [
                 'first_name', 'last_name'
             ]
         }
-        Profile.objects.filter(pk=obj.pk).update(**validated_data)
+        Profile.objects.filter(pk=obj.pk).update(updated_at=updated_at, **validated_data)
+        pin_to_primary(user)
+
+
+class ProfilingSerializer(serializers.Serializer):
+    sample_rate = serializers.FloatField(
+        required=False,
+        default=0,
+        min_value=0,
+        max_value=1,
+    )
+    timeout = serializers.IntegerField(
+        required=False,
+        default=10*60,
+        min_value=1,
+    )
+
+
+class AuditQuerySerializer(serializers.Serializer):
+    user_id = serializers.UUIDField(
+        required=False,
+    )
+    identifier = serializers.CharField(
+        required=False,
+    )
+    since = serializers.DateTimeField(
+        required=False,
+    )
+    until = serializers.DateTimeField(
+        required=False,
+    )
+
+    def validate(self, data):
+        if 'user_id' not in data and 'identifier' not in data:
+            raise serializers.ValidationError('user_id or identifier is required.')
+        return data
+
+    def get_queryset(self):
+        data = self.validated_data
+        if 'user_id' in data:
+            return AuthAuditEvent.objects.for_user(data['user_id'], data.get('since'), data.get('until'))
+        return AuthAuditEvent.objects.for_identifier(data['identifier'], data.get('since'), data.get('until'))
+
+
+class AuthAuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuthAuditEvent
+        fields = '__all__'
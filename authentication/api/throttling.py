@@ -0,0 +1,56 @@
+import uuid
+
+from rest_framework import throttling
+
+from main_project.metrics import timed
+from main_project.sharding import get_otp_redis
+
+
+class ShardedRateThrottleMixin:
+    """
+    SimpleRateThrottle's sliding window kept as a sorted set of request
+    times on the sharded OTP nodes, the throttle key doubling as the shard
+    key. Trimming, recording and counting take one MULTI round trip
+    instead of a get and a set; a denied request is taken back out, so
+    like DRF's it does not count. Keys are not read-repaired while nodes
+    change, a moved window starts over until rebalance_otp_keys has run.
+    """
+    # a new prefix, the string keys of the get/set version hold no zset
+    cache_format = 'throttle_window_%(scope)s_%(ident)s'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        member = uuid.uuid4().hex
+        client = get_otp_redis().client_for(self.key)
+        pipeline = client.pipeline()
+        pipeline.zremrangebyscore(self.key, 0, self.now - self.duration)
+        pipeline.zadd(self.key, {member: self.now})
+        pipeline.zcard(self.key)
+        pipeline.zrange(self.key, 0, 0, withscores=True)
+        pipeline.expire(self.key, self.duration)
+        with timed('redis'):
+            _, _, count, oldest, _ = pipeline.execute()
+        self.oldest = oldest[0][1] if oldest else self.now
+        if count > self.num_requests:
+            with timed('redis'):
+                client.zrem(self.key, member)
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        return max(self.duration - (self.now - self.oldest), 0)
+
+
+class AnonRateThrottle(ShardedRateThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(ShardedRateThrottleMixin, throttling.UserRateThrottle):
+    pass
@@ -2,6 +2,11 @@ from django.urls import path
 from rest_framework_jwt.views import refresh_jwt_token
 
 from .views import *
+from .async_views import (
+    send_otp_view,
+    verify_otp_view,
+    login_by_otp_view,
+)
 
 urlpatterns = [
     path('send_otp/', SendOtpView.as_view(), name='send_otp'),
@@ -14,6 +19,14 @@ urlpatterns = [
     path('change_password/', ChangePasswordView.as_view(), name='change_password'),
     path('user_list/', UserListView.as_view(), name='user_list'),
     path('profile/<slug>/', ProfileView.as_view(), name='profile'),
+    path('user_export/', UserExportView.as_view(), name='user_export'),
+    path('audit_log/', AuditLogView.as_view(), name='audit_log'),
+    path('connection_stats/', ConnectionStatsView.as_view(), name='connection_stats'),
+    path('profiling/', ProfilingView.as_view(), name='profiling'),
+    path('profiling/<str:name>/', ProfileDownloadView.as_view(), name='profile_download'),
+    path('async/send_otp/', send_otp_view, name='async_send_otp'),
+    path('async/validate_otp/', verify_otp_view, name='async_validate_otp'),
+    path('async/login_by_otp/', login_by_otp_view, name='async_login2'),
 ]
 
 
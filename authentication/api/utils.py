@@ -1,66 +1,90 @@
-from django.conf import settings     
-from better_profanity import profanity
-
-from rest_framework_jwt.serializers import VerifyJSONWebTokenSerializer
-from rest_framework_jwt.settings import api_settings
 from random import randrange
  
-from authentication.tasks import kavenegar_sms_task
+from main_project.sharding import get_otp_redis
+from main_project.metrics import timed
 from .exceptions import (
     DirtyContentException,
     NoValidOTPException,
     IncorrectOTPException,
 )
 
-redis = settings.REDIS
-
 
 def get_user_from_request(request):
+    from rest_framework_jwt.serializers import VerifyJSONWebTokenSerializer
+
     token = request.META.get('HTTP_AUTHORIZATION', " ").split(' ')[1]
     data = {'token': token}
 
-    valid_data = VerifyJSONWebTokenSerializer().validate(data)
+    with timed('jwt'):
+        valid_data = VerifyJSONWebTokenSerializer().validate(data)
     user = valid_data['user']
     return user
 
  
 def token_generator(user):
+    from rest_framework_jwt.settings import api_settings
+
     jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
     jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
 
-    payload = jwt_payload_handler(user)
-    token = jwt_encode_handler(payload)
+    with timed('jwt'):
+        payload = jwt_payload_handler(user)
+        token = jwt_encode_handler(payload)
 
     return token
 
 
 def set_otp_in_redis(mobile, otp, expiration):
-    redis.set(f'otp:{mobile}', otp, expiration)
+    with timed('redis'):
+        get_otp_redis().set(f'otp:{mobile}', otp, shard_key=mobile, ex=expiration)
 
 
 def user_send_otp_code(mobile, expiration=2*60):
+    from authentication.tasks import kavenegar_sms_task
+
     otp = randrange(10000, 99999)
     kavenegar_sms_task.apply_async(args=[mobile, otp])
     set_otp_in_redis(mobile, otp, expiration)
     return True
 
 
-def user_verify_otp(mobile, otp, set_again_in_redis=True, new_expiration=10*60):
-    get_code = redis.get(f'otp:{mobile}')
-    if get_code is None:
+def check_otp(stored_code, otp):
+    # shared with auser_verify_otp, only the Redis calls differ
+    if stored_code is None:
         raise NoValidOTPException
-    if get_code != otp:
+    if stored_code.decode() != otp:
         raise IncorrectOTPException
+
+
+def user_verify_otp(mobile, otp, set_again_in_redis=True, new_expiration=10*60):
+    with timed('redis'):
+        get_code = get_otp_redis().get(f'otp:{mobile}', shard_key=mobile)
+    check_otp(get_code, otp)
     if set_again_in_redis:
         set_otp_in_redis(mobile, otp, expiration=new_expiration)
 
 
 def delete_otp_from_redis(mobile):
-    redis.delete(f'otp:{mobile}')
+    with timed('redis'):
+        get_otp_redis().delete(f'otp:{mobile}', shard_key=mobile)
+
+
+_profanity = None
+
+
+def get_profanity():
+    # the word list is large, load it once and only when first needed
+    global _profanity
+    if _profanity is None:
+        from better_profanity import profanity
+        profanity.load_censor_words()
+        _profanity = profanity
+    return _profanity
 
 
 def check_dirty_content(dirty_content):
-    profanity.load_censor_words()
-    is_default_dirty_content = profanity.contains_profanity(dirty_content)
+    profanity = get_profanity()
+    with timed('profanity'):
+        is_default_dirty_content = profanity.contains_profanity(dirty_content)
     if is_default_dirty_content:
         raise DirtyContentException()
\ No newline at end of file
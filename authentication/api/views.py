@@ -1,12 +1,16 @@
-from rest_framework.decorators import permission_classes, throttle_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import authentication_classes, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework import generics, filters, status
-from rest_framework.throttling import AnonRateThrottle
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 
-from authentication.models import User, Profile
+from authentication.audit import audit_failures, record_event, submitted_identifier
+from authentication.models import User, Profile, AuthAuditEvent
+from main_project.connections import redis_pool_stats, database_stats
+from main_project.profiling import list_profiles, open_profile, set_sample_rate, sign_profile_request
 from .serializers import (
     SendOtpSerializer,
     VerifyOtpSerializer,
@@ -16,8 +20,14 @@ from .serializers import (
     ChangeForgetPasswordSerializer,
     ChangePasswordSerializer,
     UserSerializer,
-    GetProfileSerializer,
     UpdateProfileSerializer,
+    ProfilingSerializer,
+    AuditQuerySerializer,
+    AuthAuditEventSerializer,
+)
+from .fast_serializers import (
+    FastUserListSerializer,
+    FastProfileSerializer,
 )
 from .utils import (
     user_send_otp_code,
@@ -25,9 +35,13 @@ from .utils import (
     token_generator,
     get_user_from_request,
 )
-from .exceptions import PermissionException
+from .export import EXPORT_FORMATS, export_rows, parse_updated_since
+from .exceptions import PermissionException, InvalidExportParameterException
+from .authentication import ANONYMOUS_AUTHENTICATION, STAFF_AUTHENTICATION
+from .throttling import AnonRateThrottle
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @permission_classes((AllowAny,))
 @throttle_classes([AnonRateThrottle])
 class SendOtpView(APIView):
@@ -38,23 +52,29 @@ class SendOtpView(APIView):
         mobile = serializer.validated_data.get('mobile')
         result = user_send_otp_code(mobile=mobile, expiration=60*2)
         if result:
+            record_event(AuthAuditEvent.OTP_SENT, request, identifier=mobile)
             return Response(
                 {'detail': 'otp code has been sent successfully.'},
                 status=status.HTTP_201_CREATED
             )
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @permission_classes((AllowAny,))
 class VerifyOtpView(APIView):
     def post(self, request, *arg, **kwargs):
         serializer = VerifyOtpSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        identifier = submitted_identifier(request.data, 'mobile')
+        with audit_failures(AuthAuditEvent.OTP_FAILED, request, identifier=identifier):
+            serializer.is_valid(raise_exception=True)
+        record_event(AuthAuditEvent.OTP_VERIFIED, request, identifier=serializer.validated_data.get('mobile'))
         return Response(
             {'detail': 'otp code verified.'},
             status=status.HTTP_200_OK
         )
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @permission_classes((AllowAny,))
 @throttle_classes([AnonRateThrottle])
 class UserSignUpView(APIView):
@@ -69,37 +89,56 @@ class UserSignUpView(APIView):
         )
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @permission_classes((AllowAny,))
 @throttle_classes([AnonRateThrottle])
 class LoginByOtpView(APIView):
     def post(self, request, *arg, **kwargs):
         serializer = LogInByOtpSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        delete_otp_from_redis(serializer.validated_data.get('mobile'))
+        identifier = submitted_identifier(request.data, 'mobile')
+        with audit_failures(AuthAuditEvent.LOGIN_FAILED, request, serializer, identifier=identifier):
+            serializer.is_valid(raise_exception=True)
+        mobile = serializer.validated_data.get('mobile')
+        delete_otp_from_redis(mobile)
+        record_event(AuthAuditEvent.LOGIN_OTP, request, user=serializer.user, identifier=mobile)
         return Response(
                 {'JWT token': token_generator(serializer.user)},
                 status=status.HTTP_200_OK
             )
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @permission_classes((AllowAny,))
 class LoginByPasswordView(APIView):
     def post(self, request):
         serializer = LogInByPasswordSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        identifier = submitted_identifier(request.data, 'mobile_or_email_or_username')
+        with audit_failures(AuthAuditEvent.LOGIN_FAILED, request, serializer, identifier=identifier):
+            serializer.is_valid(raise_exception=True)
+        record_event(
+            AuthAuditEvent.LOGIN_PASSWORD,
+            request,
+            user=serializer.user,
+            identifier=serializer.validated_data.get('mobile_or_email_or_username'),
+        )
         return Response(
             {'JWT token': token_generator(serializer.user)},
             status=status.HTTP_200_OK
         )
 
 
+@authentication_classes(ANONYMOUS_AUTHENTICATION)
 @throttle_classes([AnonRateThrottle])
 class ChangeForgetPasswordView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = ChangeForgetPasswordSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        identifier = submitted_identifier(request.data, 'mobile')
+        with audit_failures(AuthAuditEvent.PASSWORD_CHANGE_FAILED, request, serializer, identifier=identifier):
+            serializer.is_valid(raise_exception=True)
         serializer.set_password()
-        delete_otp_from_redis(serializer.validated_data.get('mobile'))
+        mobile = serializer.validated_data.get('mobile')
+        delete_otp_from_redis(mobile)
+        record_event(AuthAuditEvent.PASSWORD_RESET, request, user=serializer.user, identifier=mobile)
         return Response(
             {'detail': 'password changed successfully.'},
             status=status.HTTP_200_OK
@@ -110,8 +149,10 @@ class ChangeForgetPasswordView(APIView):
 class ChangePasswordView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = ChangePasswordSerializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
+        with audit_failures(AuthAuditEvent.PASSWORD_CHANGE_FAILED, request, user=request.user):
+            serializer.is_valid(raise_exception=True)
         serializer.set_password()
+        record_event(AuthAuditEvent.PASSWORD_CHANGED, request, user=serializer.user)
         return Response(
             {'detail': 'password changed successfully.'},
             status=status.HTTP_200_OK
@@ -120,13 +161,12 @@ class ChangePasswordView(APIView):
 
 class ProfileView(APIView):
     def get(self, request, slug):
-        instance = get_object_or_404(Profile, user__slug=slug)
-        serializer = GetProfileSerializer(
-            instance=instance,
-            context={'request': request}
-        )
+        serializer = FastProfileSerializer(request)
+        row = Profile.objects.filter(user__slug=slug).values(*serializer.fields).first()
+        if row is None:
+            raise Http404
         return Response(
-            serializer.data,
+            serializer.to_representation(row),
             status=status.HTTP_201_CREATED
         )
 
@@ -159,3 +199,91 @@ class UserListView(generics.ListAPIView):
         'last_name'
     ]
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values(*FastUserListSerializer.fields)
+        serializer = FastUserListSerializer(request)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
+
+
+@authentication_classes(STAFF_AUTHENTICATION)
+@permission_classes((IsAdminUser,))
+class UserExportView(APIView):
+    def get(self, request):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise InvalidExportParameterException('output must be one of: {}.'.format(', '.join(EXPORT_FORMATS)))
+        updated_since = request.query_params.get('updated_since')
+        if updated_since is not None:
+            try:
+                updated_since = parse_updated_since(updated_since)
+            except ValueError as exc:
+                raise InvalidExportParameterException(str(exc))
+        lines, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(lines(export_rows(updated_since)), content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="users.{}"'.format(output)
+        return response
+
+
+class AuditCursorPagination(CursorPagination):
+    ordering = '-created_at'
+    page_size = 100
+
+
+@authentication_classes(STAFF_AUTHENTICATION)
+@permission_classes((IsAdminUser,))
+class AuditLogView(generics.ListAPIView):
+    serializer_class = AuthAuditEventSerializer
+    pagination_class = AuditCursorPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        query = AuditQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.get_queryset()
+
+
+@authentication_classes(STAFF_AUTHENTICATION)
+@permission_classes((IsAdminUser,))
+class ConnectionStatsView(APIView):
+    def get(self, request):
+        return Response(
+            {'redis': redis_pool_stats(), 'database': database_stats()},
+            status=status.HTTP_200_OK
+        )
+
+
+@authentication_classes(STAFF_AUTHENTICATION)
+@permission_classes((IsAdminUser,))
+class ProfilingView(APIView):
+    def get(self, request):
+        return Response(
+            {'profiles': list_profiles()},
+            status=status.HTTP_200_OK
+        )
+
+    def post(self, request):
+        serializer = ProfilingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sample_rate = serializer.validated_data['sample_rate']
+        timeout = serializer.validated_data['timeout']
+        set_sample_rate(sample_rate, timeout)
+        return Response(
+            {'sample_rate': sample_rate, 'timeout': timeout, 'signature': sign_profile_request()},
+            status=status.HTTP_200_OK
+        )
+
+
+@authentication_classes(STAFF_AUTHENTICATION)
+@permission_classes((IsAdminUser,))
+class ProfileDownloadView(APIView):
+    def get(self, request, name):
+        if name not in list_profiles():
+            raise Http404
+        return FileResponse(
+            open_profile(name),
+            as_attachment=True,
+            filename=name
+        )
@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from celery.signals import (
+            before_task_publish,
+            task_prerun,
+            task_postrun,
+            task_retry,
+            worker_ready,
+        )
+
+        from main_project import celery_metrics
+        from main_project.connections import check_database_connections
+        from main_project.profiling import profile_task_start, profile_task_end
+
+        request_started.connect(check_database_connections)
+        task_prerun.connect(profile_task_start)
+        task_postrun.connect(profile_task_end)
+        before_task_publish.connect(celery_metrics.task_published)
+        task_prerun.connect(celery_metrics.task_started)
+        task_postrun.connect(celery_metrics.task_finished)
+        task_retry.connect(celery_metrics.task_retried)
+        worker_ready.connect(celery_metrics.start_worker_telemetry)
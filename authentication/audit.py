@@ -0,0 +1,239 @@
+"""
+Authentication audit trail. Views push events onto a Redis list, which
+costs one RPUSH on the request path, and a periodic Celery task moves
+them into AuthAuditEvent with multi-row INSERTs. On PostgreSQL the table
+is range partitioned by month, so retention drops whole partitions.
+"""
+import datetime
+import logging
+from contextlib import contextmanager
+
+import orjson
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from prometheus_client import Counter
+from redis.exceptions import LockError, RedisError
+from rest_framework.exceptions import APIException
+
+from authentication.models import AuthAuditEvent
+from main_project.connections import get_redis, get_async_redis
+from main_project.metrics import timed
+
+
+BUFFER_KEY = 'audit:events'
+PROCESSING_KEY = 'audit:events:processing'
+FLUSH_LOCK_KEY = 'audit:flush_lock'
+
+EVENTS_DROPPED = Counter(
+    'auth_audit_events_dropped_total', 'Audit events lost because Redis could not take them.', ('event',),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_event(event, request=None, user=None, identifier='', reason=''):
+    user_id = getattr(user, 'pk', user)
+    meta = request.META if request is not None else {}
+    return orjson.dumps({
+        'event': event,
+        'created_at': timezone.now().timestamp(),
+        'user_id': str(user_id) if user_id is not None else None,
+        'identifier': str(identifier or '')[:64],
+        'reason': reason[:64],
+        'ip': meta.get('REMOTE_ADDR') or None,
+        'user_agent': meta.get('HTTP_USER_AGENT', '')[:256],
+    })
+
+
+def drop_event(event, exc):
+    logger.warning('audit event %s dropped: %s', event, exc)
+    EVENTS_DROPPED.labels(event=event).inc()
+
+
+def record_event(event, request=None, user=None, identifier='', reason=''):
+    """
+    Buffer an audit event. The audit trail does not get to fail a login:
+    when Redis is unreachable the event is logged and counted as dropped.
+    """
+    payload = build_event(event, request, user, identifier, reason)
+    try:
+        with timed('redis'):
+            get_redis().rpush(BUFFER_KEY, payload)
+    except RedisError as exc:
+        drop_event(event, exc)
+
+
+async def arecord_event(event, request=None, user=None, identifier='', reason=''):
+    try:
+        await get_async_redis().rpush(BUFFER_KEY, build_event(event, request, user, identifier, reason))
+    except RedisError as exc:
+        drop_event(event, exc)
+
+
+def submitted_identifier(data, field):
+    """
+    `field` of a request body that has not been validated yet, which may
+    not even be an object.
+    """
+    return data.get(field) if isinstance(data, dict) else None
+
+
+@contextmanager
+def audit_failures(event, request, serializer=None, identifier='', user=None):
+    """
+    Record `event` when the block raises an APIException, with the user
+    the serializer had resolved by then, if any.
+    """
+    try:
+        yield
+    except APIException as exc:
+        record_event(
+            event,
+            request,
+            user=user or getattr(serializer, 'user', None),
+            identifier=identifier,
+            reason=type(exc).__name__,
+        )
+        raise
+
+
+def take_batch(client, batch_size):
+    """
+    Move up to `batch_size` events from the buffer onto the processing
+    list, each with an atomic LMOVE, in one round trip.
+    """
+    pipeline = client.pipeline(transaction=False)
+    for _ in range(batch_size):
+        pipeline.lmove(BUFFER_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+    return [payload for payload in pipeline.execute() if payload is not None]
+
+
+def flush_events(batch_size=None):
+    """
+    Move buffered events into the database, `batch_size` at a time. A
+    batch waits on the processing list until its INSERT commits, and a
+    batch a crashed run left there is written first, so events are
+    written at least once and never lost. The lock is renewed per batch
+    and only released by its holder.
+    """
+    batch_size = batch_size or settings.AUDIT_FLUSH_BATCH_SIZE
+    client = get_redis()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=settings.AUDIT_FLUSH_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    flushed = 0
+    try:
+        while True:
+            payloads = client.lrange(PROCESSING_KEY, 0, -1)
+            leftover = bool(payloads)
+            if not leftover:
+                payloads = take_batch(client, batch_size)
+            if not payloads:
+                break
+            events = []
+            for payload in payloads:
+                data = orjson.loads(payload)
+                data['created_at'] = datetime.datetime.fromtimestamp(data['created_at'], tz=datetime.timezone.utc)
+                events.append(AuthAuditEvent(**data))
+            AuthAuditEvent.objects.bulk_create(events, batch_size=batch_size)
+            client.delete(PROCESSING_KEY)
+            flushed += len(payloads)
+            if not leftover and len(payloads) < batch_size:
+                break
+            # raises LockNotOwnedError if the lock expired and another run took over
+            lock.reacquire()
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # expired, and possibly held by another run now, which the
+            # token check leaves alone
+            pass
+    return flushed
+
+
+def month_start(moment, months=0):
+    month = moment.year * 12 + moment.month - 1 + months
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return '{}_y{:04d}m{:02d}'.format(AuthAuditEvent._meta.db_table, month.year, month.month)
+
+
+def create_table():
+    table = AuthAuditEvent._meta.db_table
+    if table in connection.introspection.table_names():
+        return False
+    if connection.vendor != 'postgresql':
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(AuthAuditEvent)
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE {table} ('
+            ' id bigserial NOT NULL,'
+            ' created_at timestamp with time zone NOT NULL,'
+            ' event varchar(32) NOT NULL,'
+            ' user_id uuid NULL,'
+            ' identifier varchar(64) NOT NULL,'
+            ' reason varchar(64) NOT NULL,'
+            ' ip inet NULL,'
+            ' user_agent varchar(256) NOT NULL,'
+            ' PRIMARY KEY (id, created_at)'
+            ') PARTITION BY RANGE (created_at)'.format(table=table)
+        )
+        for index in AuthAuditEvent._meta.indexes:
+            cursor.execute('CREATE INDEX {} ON {} ({})'.format(index.name, table, ', '.join(index.fields)))
+    return True
+
+
+def ensure_partitions(months_ahead=None):
+    """Create the partitions of the current month and `months_ahead` more."""
+    if connection.vendor != 'postgresql':
+        return []
+    months_ahead = settings.AUDIT_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    now = timezone.now()
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = month_start(now, offset)
+            name = partition_name(month)
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)'.format(
+                    name, AuthAuditEvent._meta.db_table,
+                ),
+                ['{} 00:00:00+00'.format(month), '{} 00:00:00+00'.format(month_start(month, 1))],
+            )
+            created.append(name)
+    return created
+
+
+def drop_expired(retention_months=None):
+    """
+    Remove events older than `retention_months` whole months: by dropping
+    partitions on PostgreSQL, with a DELETE elsewhere.
+    """
+    retention_months = settings.AUDIT_RETENTION_MONTHS if retention_months is None else retention_months
+    cutoff = month_start(timezone.now(), -retention_months)
+    if connection.vendor != 'postgresql':
+        AuthAuditEvent.objects.filter(
+            created_at__lt=datetime.datetime(cutoff.year, cutoff.month, 1, tzinfo=datetime.timezone.utc)
+        ).delete()
+        return []
+    table = AuthAuditEvent._meta.db_table
+    dropped = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits'
+            ' JOIN pg_class parent ON parent.oid = pg_inherits.inhparent'
+            ' JOIN pg_class child ON child.oid = pg_inherits.inhrelid'
+            ' WHERE parent.relname = %s',
+            [table],
+        )
+        for (name,) in cursor.fetchall():
+            if name < partition_name(cutoff):
+                cursor.execute('DROP TABLE {}'.format(name))
+                dropped.append(name)
+    return sorted(dropped)
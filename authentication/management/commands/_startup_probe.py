@@ -0,0 +1,96 @@
+"""
+Run by profile_startup in a fresh interpreter, the way a worker starts:
+times django.setup(), the WSGI application and the first request, and
+every import on the way with a sys.meta_path finder, which works on
+Python 3.6 where -X importtime does not exist. Prints one JSON line.
+
+    python _startup_probe.py PATH [--no-import-timer]
+"""
+import json
+import sys
+import time
+
+
+class TimedLoader:
+    """Wraps a module's loader to time its exec_module()."""
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.exec_module(self.loader, module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportTimer:
+    """
+    A meta path finder that finds nothing itself: it asks the finders
+    after it and wraps the loader of what they find. Nested imports run
+    inside their parent's exec_module(), which gives cumulative and self
+    times as in -X importtime.
+    """
+    def __init__(self):
+        self.children = []
+        self.imports = []
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+    def exec_module(self, loader, module):
+        self.children.append(0)
+        start = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self.children.pop()
+            if self.children:
+                self.children[-1] += cumulative
+            self.imports.append((int(cumulative * 1e6), int((cumulative - children) * 1e6), module.__name__))
+
+
+def main(path, import_timer=True):
+    timer = ImportTimer() if import_timer else None
+    if timer is not None:
+        sys.meta_path.insert(0, timer)
+
+    start = time.perf_counter()
+    import django
+    django.setup()
+    setup = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    app = time.perf_counter()
+    from django.test import Client
+    Client().get(path)
+    first_request = time.perf_counter()
+
+    if timer is not None:
+        sys.meta_path.remove(timer)
+    print(json.dumps({
+        'phases': {
+            'django_setup': setup - start,
+            'wsgi_application': app - setup,
+            'first_request': first_request - app,
+        },
+        'imports': timer.imports if timer is not None else None,
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], import_timer='--no-import-timer' not in sys.argv)
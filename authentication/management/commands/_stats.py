@@ -0,0 +1,4 @@
+def percentile(values, fraction):
+    """The nearest-rank `fraction` percentile of `values`, e.g. 0.95 for p95."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
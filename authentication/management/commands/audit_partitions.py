@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authentication.audit import create_table, drop_expired, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the audit event table and its upcoming monthly partitions, '
+        'and drop the partitions past the retention period.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.AUDIT_PARTITIONS_AHEAD)
+        parser.add_argument('--retention-months', type=int, default=settings.AUDIT_RETENTION_MONTHS)
+
+    def handle(self, *args, **options):
+        if create_table():
+            self.stdout.write('created the audit event table.')
+        for name in ensure_partitions(options['months_ahead']):
+            self.stdout.write('partition {} ready.'.format(name))
+        for name in drop_expired(options['retention_months']):
+            self.stdout.write('dropped partition {}.'.format(name))
@@ -0,0 +1,100 @@
+import time
+from math import ceil
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from authentication.admin import UserAdmin
+from authentication.models import User, Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed the user table and time the admin changelists, searches and '
+        'bulk actions. Run with --settings=main_project.bench_settings, and '
+        'BENCHMARK_POSTGRES=1 for estimated counts from planner statistics.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def seed(self, count, batch_size):
+        existing = User.objects.count()
+        for start in range(existing, count, batch_size):
+            users = User.objects.bulk_create([
+                User(
+                    mobile='09{:09d}'.format(index),
+                    email='admin_bench_{}@example.com'.format(index),
+                    username='admin_bench_{}'.format(index),
+                    slug='admin_bench_{}'.format(index),
+                    password='!',
+                    status=User.BLOCKED_STATUS if index % 100 == 0 else User.ACTIVE_STATUS,
+                )
+                for index in range(start, min(start + batch_size, count))
+            ])
+            Profile.objects.bulk_create([Profile(user=user) for user in users])
+            self.stdout.write('seeded {} users'.format(start + len(users)), ending='\r')
+        self.stdout.write('')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(User._meta.db_table))
+                cursor.execute('ANALYZE {}'.format(Profile._meta.db_table))
+
+    def measure(self, name, method, path, data=None, status=200):
+        timings = []
+        for _ in range(self.repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(self.client, method)(path, data)
+                timings.append(time.perf_counter() - start)
+            # an out of range page redirects to ?e=1, which would time nothing
+            if response.status_code != status:
+                raise CommandError('{} returned {}, expected {}'.format(name, response.status_code, status))
+        slowest = max(queries.captured_queries, key=lambda query: float(query['time']), default=None)
+        self.stdout.write('{:<24} {:>10.2f} {:>8}   {}'.format(
+            name,
+            sorted(timings)[len(timings) // 2] * 1000,
+            len(queries.captured_queries),
+            slowest['sql'][:90] if slowest else '',
+        ))
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK', False):
+            raise CommandError('Run with --settings=main_project.bench_settings.')
+
+        call_command('migrate', run_syncdb=True, verbosity=0)
+        self.seed(options['users'], options['batch_size'])
+        admin_user = User.objects.filter(username='admin_bench_root').first()
+        if admin_user is None:
+            admin_user = User.objects.create_superuser('09999999999', 'admin_bench_root', 'admin_bench_root')
+        self.client = Client()
+        self.client.force_login(admin_user)
+        self.repeat = options['repeat']
+
+        sample = options['users'] // 2
+        self.stdout.write('{} users on {}'.format(User.objects.count(), connection.vendor))
+        self.stdout.write('{:<24} {:>10} {:>8}   {}'.format('page', 'p50 ms', 'queries', 'slowest query'))
+        self.measure('user changelist', 'get', '/admin/authentication/user/')
+        page = min(100, ceil(User.objects.count() / UserAdmin.list_per_page))
+        self.measure('user changelist p{}'.format(page), 'get', '/admin/authentication/user/', {'p': page})
+        self.measure('search mobile', 'get', '/admin/authentication/user/', {'q': '09{:09d}'.format(sample)})
+        self.measure('search email', 'get', '/admin/authentication/user/', {
+            'q': 'Admin_Bench_{}@example.com'.format(sample),
+        })
+        self.measure('search username', 'get', '/admin/authentication/user/', {'q': 'ADMIN_BENCH_{}'.format(sample)})
+        self.measure('filter blocked', 'get', '/admin/authentication/user/', {'status__exact': User.BLOCKED_STATUS})
+        self.measure('profile changelist', 'get', '/admin/authentication/profile/')
+
+        selected = list(User.objects.order_by('-created_at').values_list('pk', flat=True)[:100])
+        for action in ('block_users', 'unblock_users'):
+            self.measure(action + ' x100', 'post', '/admin/authentication/user/', {
+                'action': action,
+                '_selected_action': [str(pk) for pk in selected],
+                'index': 0,
+            }, status=302)
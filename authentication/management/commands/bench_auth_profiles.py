@@ -0,0 +1,63 @@
+import base64
+import time
+
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import User
+from authentication.api.authentication import (
+    ANONYMOUS_AUTHENTICATION,
+    JWT_AUTHENTICATION,
+    SESSION_AUTHENTICATION,
+    BASIC_AUTHENTICATION,
+)
+from authentication.api.utils import token_generator
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request authentication cost of each authentication profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+
+    def run(self, authenticators, headers, count):
+        factory = APIRequestFactory()
+        session_middleware = SessionMiddleware(lambda request: None)
+        auth_middleware = AuthenticationMiddleware(lambda request: None)
+        start = time.perf_counter()
+        for _ in range(count):
+            django_request = factory.get('/', **headers)
+            session_middleware.process_request(django_request)
+            auth_middleware.process_request(django_request)
+            request = Request(
+                django_request,
+                authenticators=[authenticator() for authenticator in authenticators],
+            )
+            request.user
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        password = 'bench_auth_profiles'
+        user = User.objects.create_user(
+            mobile='09999999998',
+            email='bench_auth_profiles@example.com',
+            username='bench_auth_profiles',
+            password=password,
+        )
+        try:
+            basic = base64.b64encode('{}:{}'.format(user.username, password).encode()).decode()
+            profiles = [
+                ('anonymous', ANONYMOUS_AUTHENTICATION, {}),
+                ('jwt', JWT_AUTHENTICATION, {'HTTP_AUTHORIZATION': 'JWT {}'.format(token_generator(user))}),
+                ('session', SESSION_AUTHENTICATION, {}),
+                ('basic (cached)', BASIC_AUTHENTICATION, {'HTTP_AUTHORIZATION': 'Basic {}'.format(basic)}),
+            ]
+            for name, authenticators, headers in profiles:
+                elapsed = self.run(authenticators, headers, count)
+                self.stdout.write('{:<16} {:>8.3f} ms/req'.format(name, elapsed / count * 1000))
+        finally:
+            user.delete()
@@ -0,0 +1,71 @@
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.urls import path
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authentication.models import User
+from authentication.api.utils import token_generator
+
+
+class RegularAuthView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'id': str(request.user.pk)})
+
+
+urlpatterns = [
+    path('regular/', RegularAuthView.as_view()),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare auth_request throughput with a regular DRF view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def run(self, handler, environ, count):
+        statuses = set()
+
+        def start_response(status, headers):
+            statuses.add(status)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            handler(dict(environ), start_response)
+        elapsed = time.perf_counter() - start
+        return elapsed, statuses
+
+    def report(self, name, elapsed, statuses, count):
+        self.stdout.write('{:<14} {:>10.1f} req/s {:>8.3f} ms/req  {}'.format(
+            name, count / elapsed, elapsed / count * 1000, ', '.join(sorted(statuses))
+        ))
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        user = User.objects.create_user(
+            mobile='09999999999',
+            email='bench_auth_request@example.com',
+            username='bench_auth_request',
+            password='bench_auth_request',
+        )
+        try:
+            header = 'JWT {}'.format(token_generator(user))
+
+            with override_settings(MIDDLEWARE=[], ROOT_URLCONF='main_project.auth_request_urls'):
+                environ = RequestFactory()._base_environ(PATH_INFO='/auth_request/', HTTP_AUTHORIZATION=header)
+                elapsed, statuses = self.run(WSGIHandler(), environ, count)
+            self.report('auth_request', elapsed, statuses, count)
+
+            with override_settings(ROOT_URLCONF=__name__):
+                environ = RequestFactory()._base_environ(PATH_INFO='/regular/', HTTP_AUTHORIZATION=header)
+                elapsed, statuses = self.run(WSGIHandler(), environ, count)
+            self.report('drf view', elapsed, statuses, count)
+        finally:
+            user.delete()
@@ -0,0 +1,65 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+from ._stats import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent requests at a running deployment and report '
+        'throughput and latency percentiles, e.g. to compare the WSGI and '
+        'ASGI servers on the same core count.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--data', help='JSON request body.')
+        parser.add_argument('--header', action='append', default=[], help='"Name: value", repeatable.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def handle(self, *args, **options):
+        headers = {'Content-Type': 'application/json'}
+        for header in options['header']:
+            name, value = header.split(':', 1)
+            headers[name.strip()] = value.strip()
+        body = options['data'].encode() if options['data'] else None
+
+        def call(_):
+            request = Request(options['url'], data=body, headers=headers, method=options['method'])
+            start = time.perf_counter()
+            try:
+                with urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    code = response.status
+            except HTTPError as exc:
+                code = exc.code
+            except OSError:
+                code = 0
+            return code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(call, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency * 1000 for _, latency in results]
+        codes = {}
+        for code, _ in results:
+            codes[code] = codes.get(code, 0) + 1
+        self.stdout.write(json.dumps({
+            'requests': len(results),
+            'concurrency': options['concurrency'],
+            'throughput': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'status_codes': codes,
+        }))
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from authentication.models import User
+from main_project.connections import get_redis, redis_pool_stats
+from ._stats import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the connection layer: run the request lifecycle of a '
+        'typical view (one query, one Redis read) from concurrent threads, '
+        'first with a new database and Redis connection per request, then '
+        'with persistent database connections and the shared Redis pool, '
+        'and compare the latency percentiles. Run it against the real '
+        'PostgreSQL and Redis, connection setup is what it measures.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--conn-max-age', type=int, default=settings.DATABASES['default']['CONN_MAX_AGE'])
+
+    def new_redis_client(self):
+        options = dict(settings.REDIS_POOL_OPTIONS)
+        options.pop('timeout', None)
+        return redis.Redis(connection_pool=redis.ConnectionPool.from_url(settings.REDIS_URL, **options))
+
+    def request(self, pooled):
+        # what the handler does around a view: request_started, the view, request_finished
+        start = time.perf_counter()
+        close_old_connections()
+        User.objects.only('pk').first()
+        client = get_redis() if pooled else self.new_redis_client()
+        client.get('bench_connections')
+        if not pooled:
+            client.close()
+            client.connection_pool.disconnect()
+        close_old_connections()
+        return time.perf_counter() - start
+
+    def run(self, pooled, options):
+        settings_dicts = [connections.databases[alias] for alias in connections]
+        saved = [settings_dict['CONN_MAX_AGE'] for settings_dict in settings_dicts]
+        for settings_dict in settings_dicts:
+            settings_dict['CONN_MAX_AGE'] = options['conn_max_age'] if pooled else 0
+        latencies = []
+
+        def worker(count):
+            try:
+                for _ in range(count):
+                    latencies.append(self.request(pooled))
+            finally:
+                connections.close_all()
+
+        count = options['requests'] // options['concurrency']
+        threads = [threading.Thread(target=worker, args=(count,)) for _ in range(options['concurrency'])]
+        start = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for settings_dict, value in zip(settings_dicts, saved):
+                settings_dict['CONN_MAX_AGE'] = value
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency * 1000 for latency in latencies]
+        return {
+            'throughput': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+        }
+
+    def handle(self, *args, **options):
+        results = {
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'per_request_connections': self.run(False, options),
+            'pooled_connections': self.run(True, options),
+        }
+        results['pooled_connections']['redis_pool'] = redis_pool_stats()
+        self.stdout.write(json.dumps(results))
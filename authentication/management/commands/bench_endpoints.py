@@ -0,0 +1,181 @@
+import re
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from redis.connection import Connection
+
+from authentication.models import User, Profile
+from main_project.sharding import get_otp_redis
+from ._stats import percentile
+
+
+# Per-request ceilings, set from what each endpoint is meant to cost. Each
+# has one query and one Redis round trip to spare, so an added lookup does
+# not fail the run while an N+1 over a page or a list overshoots at once;
+# the spare round trip also covers the profiling middleware's periodic
+# sample rate read. Redis counts round trips, a pipeline being one.
+BUDGETS = {
+    # account existence check; throttle window, OTP SET, audit RPUSH
+    'send_otp': {'db': 2, 'redis': 4},
+    # never touches the database; two throttle windows, OTP GET and SET, audit RPUSH
+    'validate_otp': {'db': 0, 'redis': 6},
+    # uniqueness check, user and profile inserts, profile save; throttle window, OTP GET and DEL
+    'registration': {'db': 5, 'redis': 4},
+    # existence check, user row; two throttle windows, audit RPUSH
+    'login_by_password': {'db': 3, 'redis': 4},
+    # token user, count, one page joined to its profiles; throttle window
+    'user_list': {'db': 4, 'redis': 2},
+    # token user, profile; throttle window
+    'profile_get': {'db': 3, 'redis': 2},
+    # token user, profile, the user as the permission and serializer load
+    # it, user and profile updates; throttle window
+    'profile_put': {'db': 7, 'redis': 2},
+}
+
+SPAN_PATTERN = re.compile(r'(\w+);dur=[\d.]+;desc="(\d+) calls"')
+
+
+@contextmanager
+def count_redis_round_trips():
+    """
+    Count the round trips of every redis-py connection while the block
+    runs, so django_redis cache and session traffic is counted along with
+    the OTP and throttle clients. A pipeline is one round trip; the
+    connection's own AUTH, SELECT and health check PINGs are left out,
+    fakeredis would otherwise PING before every command.
+    """
+    counter = {'round_trips': 0}
+    send_packed_command = Connection.send_packed_command
+
+    def counting(connection, command, check_health=True):
+        if check_health:
+            counter['round_trips'] += 1
+        return send_packed_command(connection, command, check_health)
+
+    with mock.patch.object(Connection, 'send_packed_command', counting):
+        yield counter
+
+
+def over_budget(samples):
+    """The budget overruns in `samples`, as messages."""
+    failures = []
+    for name, sample in samples.items():
+        for kind in ('db', 'redis'):
+            if sample[kind] > BUDGETS[name][kind]:
+                failures.append('{} used {} {} calls, budget is {}'.format(
+                    name, sample[kind], kind, BUDGETS[name][kind]
+                ))
+    return failures
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a signup/login/profile request mix through the test client '
+        'and enforce per-endpoint query and Redis budgets. '
+        'Run with --settings=main_project.bench_settings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--seed-users', type=int, default=100)
+
+    def seed(self, count):
+        users = User.objects.bulk_create([
+            User(
+                mobile='0911{:07d}'.format(index),
+                email='seed_{}@example.com'.format(index),
+                username='seed_{}'.format(index),
+                slug='seed_{}'.format(index),
+            )
+            for index in range(count)
+        ])
+        Profile.objects.bulk_create([Profile(user=user) for user in users])
+
+    def call(self, name, method, *args, **kwargs):
+        with count_redis_round_trips() as redis_calls:
+            start = time.perf_counter()
+            response = getattr(self.client, method)(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise CommandError('{} returned {}: {}'.format(name, response.status_code, response.content[:200]))
+        spans = dict(SPAN_PATTERN.findall(response.get('Server-Timing', '')))
+        sample = self.samples.setdefault(name, {'latency': [], 'db': 0, 'redis': 0})
+        sample['latency'].append(elapsed)
+        sample['db'] = max(sample['db'], int(spans.get('db', 0)))
+        sample['redis'] = max(sample['redis'], redis_calls['round_trips'])
+        return response
+
+    def run_scenario(self, index):
+        mobile = '0912{:07d}'.format(index)
+        username = 'bench_{}'.format(index)
+        password = 'bench-password-{}'.format(index)
+
+        self.call('send_otp', 'post', '/api/authentication/send_otp/', {'mobile': mobile}, content_type='application/json')
+        otp = get_otp_redis().get('otp:{}'.format(mobile), shard_key=mobile).decode()
+        self.call('validate_otp', 'post', '/api/authentication/validate_otp/', {
+            'mobile': mobile, 'otp': otp,
+        }, content_type='application/json')
+        self.call('registration', 'post', '/api/authentication/registration/', {
+            'mobile': mobile,
+            'otp': otp,
+            'username': username,
+            'email': '{}@example.com'.format(username),
+            'password': password,
+            'password2': password,
+        }, content_type='application/json')
+        token = self.call('login_by_password', 'post', '/api/authentication/login_by_password/', {
+            'mobile_or_email_or_username': username, 'password': password,
+        }, content_type='application/json').json()['JWT token']
+        auth = {'HTTP_AUTHORIZATION': 'JWT {}'.format(token)}
+
+        self.call('user_list', 'get', '/api/authentication/user_list/', **auth)
+        self.call('profile_get', 'get', '/api/authentication/profile/{}/'.format(username), **auth)
+        self.call('profile_put', 'put', '/api/authentication/profile/{}/'.format(username), {
+            'first_name': 'Bench',
+        }, content_type='application/json', **auth)
+
+    def measure(self, iterations):
+        """Run the scenario `iterations` times, return the per-endpoint samples and the wall time."""
+        self.client = Client()
+        self.samples = {}
+        with mock.patch('kavenegar.KavenegarAPI'):
+            start = time.perf_counter()
+            for index in range(iterations):
+                self.run_scenario(index)
+            elapsed = time.perf_counter() - start
+        return self.samples, elapsed
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK', False):
+            raise CommandError('Run with --settings=main_project.bench_settings.')
+
+        call_command('migrate', run_syncdb=True, verbosity=0)
+        self.seed(options['seed_users'])
+        samples, elapsed = self.measure(options['iterations'])
+
+        requests = sum(len(sample['latency']) for sample in samples.values())
+        self.stdout.write('{} requests in {:.2f}s ({:.1f} req/s)'.format(requests, elapsed, requests / elapsed))
+        self.stdout.write('{:<18} {:>8} {:>8} {:>8} {:>8} {:>10} {:>10}'.format(
+            'endpoint', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'redis'
+        ))
+        for name, sample in samples.items():
+            latency = sample['latency']
+            budget = BUDGETS[name]
+            self.stdout.write('{:<18} {:>8.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>10} {:>10}'.format(
+                name,
+                len(latency) / sum(latency),
+                percentile(latency, 0.50) * 1000,
+                percentile(latency, 0.95) * 1000,
+                percentile(latency, 0.99) * 1000,
+                '{}/{}'.format(sample['db'], budget['db']),
+                '{}/{}'.format(sample['redis'], budget['redis']),
+            ))
+
+        failures = over_budget(samples)
+        if failures:
+            raise CommandError('\n'.join(failures))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import User, Profile
+from authentication.api.fast_serializers import FastUserListSerializer
+from authentication.api.renderers import ORJSONRenderer
+from authentication.api.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    help = 'Time serialization and rendering of a user_list page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def measure(self, func, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        request = Request(APIRequestFactory().get('/api/authentication/user_list/'))
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    mobile='0900{:07d}'.format(index),
+                    email='bench_serializers_{}@example.com'.format(index),
+                    username='bench_serializers_{}'.format(index),
+                    slug='bench_serializers_{}'.format(index),
+                )
+                for index in range(rows)
+            ])
+            Profile.objects.bulk_create([Profile(user=user) for user in users])
+            queryset = User.objects.filter(username__startswith='bench_serializers_')
+
+            def drf():
+                return UserSerializer(list(queryset), many=True, context={'request': request}).data
+
+            def fast():
+                rows = queryset.values(*FastUserListSerializer.fields)
+                return FastUserListSerializer(request).to_representation(rows)
+
+            data = drf()
+            results = [
+                ('UserSerializer', self.measure(drf, repeat)),
+                ('FastUserListSerializer', self.measure(fast, repeat)),
+                ('JSONRenderer', self.measure(lambda: JSONRenderer().render(data), repeat)),
+                ('ORJSONRenderer', self.measure(lambda: ORJSONRenderer().render(data), repeat)),
+            ]
+            transaction.set_rollback(True)
+
+        for name, ms in results:
+            self.stdout.write('{:<24} {:>8.3f} ms per {} rows'.format(name, ms, rows))
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.api.export import EXPORT_FORMATS, export_rows, parse_updated_since
+
+
+class Command(BaseCommand):
+    help = 'Stream users joined with their profiles as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="Output file, '-' for stdout.")
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--updated-since',
+            help='Only users created or with a profile updated at or after this ISO 8601 date/datetime.',
+        )
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_updated_since(options['updated_since'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+
+        lines, _ = EXPORT_FORMATS[options['format']]
+        rows = export_rows(updated_since, chunk_size=options['chunk_size'])
+        binary = options['format'] == 'ndjson'
+        if options['output'] == '-':
+            stream = sys.stdout.buffer if binary else sys.stdout
+        else:
+            stream = open(options['output'], 'wb' if binary else 'w', newline=None if binary else '')
+        exported = 0
+        try:
+            for line in lines(rows):
+                stream.write(line)
+                exported += 1
+        finally:
+            if options['output'] != '-':
+                stream.close()
+        if options['format'] == 'csv':
+            exported -= 1
+        self.stderr.write('exported {} users.'.format(exported))
@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from authentication.api.regex_validators import mobile_format
+from authentication.models import User, Profile, get_user_slug
+
+
+REQUIRED_FIELDS = ('mobile', 'email', 'username', 'password')
+# stays under SQLite's limit of 999 query parameters
+LOOKUP_BATCH_SIZE = 500
+mobile_pattern = re.compile(mobile_format)
+
+
+def hash_password(password):
+    # set up Django in the pool's processes here, the initializer argument
+    # of ProcessPoolExecutor needs Python 3.7
+    if not apps.ready:
+        django.setup()
+    return make_password(password)
+
+
+def read_rows(stream, file_format):
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Import users from CSV or NDJSON (mobile, email, username, password, '
+        'optional first_name/last_name) in batches, bypassing the per-row '
+        'save() and profile signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'])
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=None, help='Hashing processes, 0 hashes inline.')
+        parser.add_argument(
+            '--prehashed',
+            action='store_true',
+            help='The password column already holds Django password hashes.',
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Skip rows whose mobile, email or username already exist.',
+        )
+
+    def valid_rows(self, chunk, prehashed):
+        rows = []
+        for row in chunk:
+            if not isinstance(row, dict):
+                # valid JSON such as [1, 2] or "x" on an NDJSON line
+                self.stderr.write('rejected {}: not an object'.format(json.dumps(row)[:100]))
+                self.skipped += 1
+                continue
+            if not all(row.get(field) for field in REQUIRED_FIELDS) or not mobile_pattern.match(row['mobile']):
+                self.skipped += 1
+                continue
+            if prehashed:
+                try:
+                    identify_hasher(row['password'])
+                except ValueError:
+                    self.skipped += 1
+                    continue
+            rows.append(row)
+        return rows
+
+    def hash_passwords(self, passwords, executor, workers):
+        if executor is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(executor.map(hash_password, passwords, chunksize=chunksize))
+
+    def insert(self, rows, hashes, ignore_conflicts):
+        users = [
+            User(
+                mobile=row['mobile'],
+                email=row['email'],
+                username=row['username'],
+                slug=get_user_slug(row['username']),
+                first_name=row.get('first_name') or None,
+                last_name=row.get('last_name') or None,
+                password=password_hash,
+            )
+            for row, password_hash in zip(rows, hashes)
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=1000, ignore_conflicts=ignore_conflicts)
+            user_ids = [user.pk for user in users]
+            if ignore_conflicts:
+                # ids are generated client side, keep the ones that made it in
+                user_ids = [
+                    user_id
+                    for start in range(0, len(user_ids), LOOKUP_BATCH_SIZE)
+                    for user_id in User.objects.filter(
+                        pk__in=user_ids[start:start + LOOKUP_BATCH_SIZE]
+                    ).values_list('pk', flat=True)
+                ]
+            Profile.objects.bulk_create(
+                [Profile(user_id=user_id) for user_id in user_ids],
+                batch_size=1000,
+                ignore_conflicts=ignore_conflicts,
+            )
+        return len(user_ids)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        prehashed = options['prehashed']
+        self.skipped = 0
+        imported = 0
+
+        workers = os.cpu_count() if options['workers'] is None else options['workers']
+        executor = None
+        if not prehashed and workers:
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        stream = sys.stdin if path == '-' else open(path, newline='' if file_format == 'csv' else None)
+        start = time.perf_counter()
+        try:
+            for number, chunk in enumerate(chunked(read_rows(stream, file_format), options['chunk_size']), 1):
+                rows = self.valid_rows(chunk, prehashed)
+                passwords = [row['password'] for row in rows]
+                hashes = passwords if prehashed else self.hash_passwords(passwords, executor, workers)
+                try:
+                    imported += self.insert(rows, hashes, options['ignore_conflicts'])
+                except IntegrityError as exc:
+                    # each chunk is its own transaction, the earlier ones stay
+                    raise CommandError(
+                        'chunk {} conflicts with existing users ({}). {} users from the chunks before it '
+                        'were committed, rerun with --ignore-conflicts to skip the existing rows.'.format(
+                            number, exc, imported
+                        )
+                    )
+                elapsed = time.perf_counter() - start
+                self.stdout.write('{} users imported, {} skipped ({:.0f} rows/min)'.format(
+                    imported, self.skipped, imported / elapsed * 60
+                ))
+        except (ValueError, KeyError) as exc:
+            raise CommandError('invalid input: {}'.format(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if executor is not None:
+                executor.shutdown()
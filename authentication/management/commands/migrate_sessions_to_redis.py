@@ -0,0 +1,40 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main_project.sessions import SessionStore
+
+
+# stays under SQLite's limit of 999 query parameters
+DELETE_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Copy unexpired database sessions into the Redis session store.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete the database rows once they have been copied.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        sessions = Session.objects.filter(expire_date__gt=now).order_by()
+        copied = []
+        for session in sessions.iterator(chunk_size=options['chunk_size']):
+            store = SessionStore(session.session_key)
+            session_data = store.decode(session.session_data)
+            if not session_data:
+                continue
+            expiry = int((session.expire_date - now).total_seconds())
+            store._cache.set(store.cache_key, store.serializer().dumps(session_data), expiry)
+            copied.append(session.session_key)
+
+        if options['delete']:
+            # only the rows copied above, sessions written since stay put
+            for start in range(0, len(copied), DELETE_BATCH_SIZE):
+                Session.objects.filter(session_key__in=copied[start:start + DELETE_BATCH_SIZE]).delete()
+        self.stdout.write('copied {} sessions.'.format(len(copied)))
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROBE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_startup_probe.py')
+
+
+class Command(BaseCommand):
+    help = (
+        'Start a fresh interpreter the way a worker does and report the '
+        'slowest imports and the time to the first request. Imports are '
+        'timed with a meta path finder, or with --importtime by the '
+        'interpreter itself on Python 3.7+.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/authentication/send_otp/')
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument(
+            '--importtime',
+            action='store_true',
+            help='Use -X importtime instead of the meta path finder (Python 3.7+).',
+        )
+
+    def parse_import_times(self, stderr):
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            imports.append((int(cumulative_us), int(self_us), module.strip()))
+        return imports
+
+    def handle(self, *args, **options):
+        command = [sys.executable, PROBE, options['path']]
+        if options['importtime']:
+            if sys.version_info < (3, 7):
+                raise CommandError('-X importtime needs Python 3.7 or later, leave out --importtime.')
+            command[1:1] = ['-X', 'importtime']
+            command.append('--no-import-timer')
+        # the probe runs as a script, so the project is not on its path yet
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])
+        ))
+
+        start = time.perf_counter()
+        process = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            env=env,
+        )
+        total = time.perf_counter() - start
+        if process.returncode:
+            raise CommandError(process.stderr[-2000:])
+
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        imports = result['imports']
+        if imports is None:
+            imports = self.parse_import_times(process.stderr)
+
+        self.stdout.write('{:<40} {:>10}'.format('phase', 'ms'))
+        for phase, seconds in result['phases'].items():
+            self.stdout.write('{:<40} {:>10.1f}'.format(phase, seconds * 1000))
+        self.stdout.write('{:<40} {:>10.1f}'.format('process start to first response', total * 1000))
+
+        self.stdout.write('')
+        self.stdout.write('{:<60} {:>10} {:>10}'.format('module', 'cum ms', 'self ms'))
+        for cumulative_us, self_us, module in sorted(imports, reverse=True)[:options['top']]:
+            self.stdout.write('{:<60} {:>10.1f} {:>10.1f}'.format(module, cumulative_us / 1000, self_us / 1000))
@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+
+from main_project.sharding import get_otp_redis
+
+
+KEY_PATTERNS = ('otp:*', 'throttle_*')
+
+
+def shard_key_of(key):
+    # OTP keys are placed by mobile number, throttle keys by themselves
+    key = key.decode()
+    return key[len('otp:'):] if key.startswith('otp:') else key
+
+
+def rebalance(sharded, batch_size=500):
+    """
+    Move every OTP and throttle key that sits on a node other than its
+    owner on the current ring, a batch at a time with one pipeline per
+    source and target node. Returns {source url: keys moved}.
+    """
+    moved = {}
+    for url, client in sharded.clients.items():
+        for pattern in KEY_PATTERNS:
+            batch = []
+            for key in client.scan_iter(match=pattern, count=batch_size):
+                if sharded.ring.get_url(shard_key_of(key)) != url:
+                    batch.append(key)
+                if len(batch) >= batch_size:
+                    moved[url] = moved.get(url, 0) + move_keys(sharded, client, batch)
+                    batch = []
+            if batch:
+                moved[url] = moved.get(url, 0) + move_keys(sharded, client, batch)
+    return moved
+
+
+def move_keys(sharded, source, keys):
+    pipeline = source.pipeline(transaction=False)
+    for key in keys:
+        pipeline.dump(key)
+        pipeline.pttl(key)
+    values = pipeline.execute()
+
+    targets = {}
+    for key, dumped, ttl in zip(keys, values[::2], values[1::2]):
+        if dumped is None:
+            continue
+        url = sharded.ring.get_url(shard_key_of(key))
+        if url not in targets:
+            targets[url] = sharded.clients[url].pipeline(transaction=False)
+        targets[url].restore(key, max(ttl, 0), dumped, replace=True)
+    for target in targets.values():
+        target.execute()
+    source.delete(*keys)
+    return len(keys)
+
+
+class Command(BaseCommand):
+    help = (
+        'Move OTP and throttle keys to their owners on the current '
+        'OTP_REDIS_URLS ring, after which OTP_REDIS_PREVIOUS_URLS can be dropped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        moved = rebalance(get_otp_redis(), options['batch_size'])
+        for url, count in sorted(moved.items()):
+            self.stdout.write('moved {} keys off {}'.format(count, url.rsplit('@', 1)[-1]))
+        self.stdout.write('moved {} keys.'.format(sum(moved.values())))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.dispatch import receiver 
@@ -21,6 +22,10 @@ def get_img_upload_path(instance, filename):
     return f'media/{str(instance.user.mobile)}/{filename}'
 
 
+def get_user_slug(username):
+    return slugify(unidecode(str(username)))
+
+
 class UserManager(BaseUserManager):
     def create_user(self, mobile, email, username, password):
         if not mobile:
@@ -54,10 +59,13 @@ class UserManager(BaseUserManager):
 
 
 class User(AbstractBaseUser, PermissionsMixin):
+    ACTIVE_STATUS = 0
+    INACTIVE_STATUS = 1
+    BLOCKED_STATUS = 2
     STATUS = (
-        (0, _('active')),
-        (1, _('inactive')),
-        (2, _('blocked')),
+        (ACTIVE_STATUS, _('active')),
+        (INACTIVE_STATUS, _('inactive')),
+        (BLOCKED_STATUS, _('blocked')),
     )
 
     id = models.UUIDField(
@@ -97,7 +105,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         unique=True
         )
     created_at = models.DateTimeField(
-        default=now
+        default=now,
+        db_index=True
+        )
+    updated_at = models.DateTimeField(
+        default=now,
+        db_index=True
         )
     status = models.SmallIntegerField(
         choices=STATUS, 
@@ -108,6 +121,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'username'
     EMAIL_FIELD = 'email'
 
+    class Meta:
+        # case-insensitive admin search, iexact compiles to UPPER(column)
+        indexes = [
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -122,7 +142,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         return "{} {}".format(self.first_name, self.last_name)
 
     def save(self, *args, **kwargs):
-        self.slug = slugify(unidecode(str(self.username)))
+        self.slug = get_user_slug(self.username)
+        # incremental exports select on updated_at, queryset updates set it
+        # themselves
+        self.updated_at = now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'updated_at'}
         super(User, self).save(*args, **kwargs)
 
 
@@ -138,6 +163,7 @@ class Profile(models.Model):
         )
     gender = models.CharField(
         choices=GENDER, 
+        max_length=1,
         null=True, 
         blank=True
         )
@@ -155,7 +181,7 @@ class Profile(models.Model):
         blank=True, 
         max_length=300
         )
-    updated_at = models.DateTimeField(default=now)
+    updated_at = models.DateTimeField(default=now, db_index=True)
 
     @receiver(post_save, sender=User)
     def create_user_profile(sender, instance, created, **kwargs):
@@ -168,4 +194,85 @@ class Profile(models.Model):
 
     def __str__(self):
         return self.user.username
-    
\ No newline at end of file
+    
+
+class AuthAuditEventQuerySet(models.QuerySet):
+    def between(self, since=None, until=None):
+        queryset = self
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+        return queryset.order_by('-created_at')
+
+    def for_user(self, user_id, since=None, until=None):
+        return self.filter(user_id=user_id).between(since, until)
+
+    def for_identifier(self, identifier, since=None, until=None):
+        return self.filter(identifier=identifier).between(since, until)
+
+
+class AuthAuditEvent(models.Model):
+    OTP_SENT = 'otp_sent'
+    OTP_VERIFIED = 'otp_verified'
+    OTP_FAILED = 'otp_failed'
+    LOGIN_OTP = 'login_otp'
+    LOGIN_PASSWORD = 'login_password'
+    LOGIN_FAILED = 'login_failed'
+    PASSWORD_CHANGED = 'password_changed'
+    PASSWORD_RESET = 'password_reset'
+    PASSWORD_CHANGE_FAILED = 'password_change_failed'
+    EVENTS = (
+        (OTP_SENT, _('otp sent')),
+        (OTP_VERIFIED, _('otp verified')),
+        (OTP_FAILED, _('otp verification failed')),
+        (LOGIN_OTP, _('login by otp')),
+        (LOGIN_PASSWORD, _('login by password')),
+        (LOGIN_FAILED, _('login failed')),
+        (PASSWORD_CHANGED, _('password changed')),
+        (PASSWORD_RESET, _('password reset')),
+        (PASSWORD_CHANGE_FAILED, _('password change failed')),
+    )
+
+    id = models.BigAutoField(
+        primary_key=True
+        )
+    created_at = models.DateTimeField()
+    event = models.CharField(
+        choices=EVENTS,
+        max_length=32
+        )
+    # no foreign key, the trail outlives deleted users
+    user_id = models.UUIDField(
+        null=True,
+        blank=True
+        )
+    identifier = models.CharField(
+        max_length=64,
+        blank=True
+        )
+    reason = models.CharField(
+        max_length=64,
+        blank=True
+        )
+    ip = models.GenericIPAddressField(
+        null=True,
+        blank=True
+        )
+    user_agent = models.CharField(
+        max_length=256,
+        blank=True
+        )
+    objects = AuthAuditEventQuerySet.as_manager()
+
+    class Meta:
+        # created by the audit_partitions command, monthly range
+        # partitions on PostgreSQL
+        managed = False
+        indexes = [
+            models.Index(fields=['user_id', 'created_at'], name='audit_user_created_idx'),
+            models.Index(fields=['identifier', 'created_at'], name='audit_identifier_created_idx'),
+        ]
+
+    def __str__(self):
+        return '{} {}'.format(self.event, self.created_at)
@@ -1,12 +1,13 @@
 from celery import shared_task
 from django.conf import settings
-from kavenegar import KavenegarAPI
 
 from authentication.api.exceptions import OTPSendingException
 
 
 @shared_task
 def kavenegar_sms_task(receptor, token):
+    from kavenegar import KavenegarAPI
+
     try:
         api = KavenegarAPI(settings.SMS_API_KEY)
         params = {
@@ -18,3 +19,18 @@ def kavenegar_sms_task(receptor, token):
 
     except:
         raise OTPSendingException()
+
+
+@shared_task
+def flush_audit_events():
+    from authentication.audit import flush_events
+
+    return flush_events()
+
+
+@shared_task
+def maintain_audit_partitions():
+    from authentication.audit import drop_expired, ensure_partitions
+
+    ensure_partitions()
+    return drop_expired()
@@ -0,0 +1,14 @@
+from .settings import *
+
+
+# Settings for the reverse-proxy subrequest app: no middleware, no DRF
+# request cycle and only the apps the User model depends on.
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'authentication',
+]
+
+MIDDLEWARE = []
+
+ROOT_URLCONF = 'main_project.auth_request_urls'
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from authentication.api.auth_request import auth_request
+
+
+urlpatterns = [
+    path('auth_request/', auth_request, name='auth_request'),
+]
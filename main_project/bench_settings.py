@@ -0,0 +1,59 @@
+import os
+
+import fakeredis
+import fakeredis.aioredis
+
+# placeholders for the variables settings.py requires, the benchmark
+# runs against SQLite (unless BENCHMARK_POSTGRES is set) and an
+# in-process fake Redis
+for name, value in (
+    ('SECRET_KEY', 'benchmark'),
+    ('ALLOWED_HOSTS', 'testserver'),
+    ('POSTGRES_NAME', ''),
+    ('POSTGRES_USER', ''),
+    ('POSTGRES_PASSWORD', ''),
+    ('POSTGRES_HOST', ''),
+    ('POSTGRES_PORT', '5432'),
+    ('DEVELOP_THROTTLE_ANON_RATE', '1000000'),
+    ('DEVELOP_THROTTLE_USER_RATE', '1000000'),
+    ('REDIS_PASSWORD', ''),
+    ('REDIS_HOST', 'localhost'),
+    ('REDIS_PORT', '6379'),
+    ('SMS_API_KEY', ''),
+    ('SMS_PHONE_NUMBER', ''),
+    ('SMS_TEMPLATE_NAME', ''),
+):
+    os.environ.setdefault(name, value)
+
+from .settings import *
+
+
+BENCHMARK = True
+DEBUG = False
+
+# BENCHMARK_POSTGRES=1 keeps the POSTGRES_* database, which the admin
+# benchmark needs for planner statistics
+if not os.environ.get('BENCHMARK_POSTGRES'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+else:
+    DATABASES = {'default': DATABASES['default']}
+DATABASE_REPLICAS = []
+
+REDIS_POOL_OPTIONS = dict(REDIS_POOL_OPTIONS, connection_class=fakeredis.FakeConnection)
+# the async views' clients, on the same fake server as the sync pool
+REDIS_ASYNC_CONNECTION_CLASS = fakeredis.aioredis.FakeConnection
+
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
+CELERY_BROKER_TRANSPORT_OPTIONS = {}
+CELERY_TASK_ALWAYS_EAGER = True
+
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    'anon': '1000000/day',
+    'user': '1000000/day',
+})
@@ -8,6 +8,25 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@app.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    # celery.schedules is only needed once the app is configured, which
+    # web processes put off until they send their first task
+    from celery.schedules import crontab
+    from django.conf import settings
+
+    sender.add_periodic_task(
+        settings.AUDIT_FLUSH_INTERVAL,
+        sender.signature('authentication.tasks.flush_audit_events'),
+        name='flush-audit-events',
+    )
+    sender.add_periodic_task(
+        crontab(hour=3, minute=0),
+        sender.signature('authentication.tasks.maintain_audit_partitions'),
+        name='maintain-audit-partitions',
+    )
+
+
 app_queues = (
     'Q-common_tasks',
 )
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import redis
+from django.conf import settings
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram
+
+from main_project.metrics import render
+
+
+PUBLISHED_AT_HEADER = 'published_at'
+# kombu's redis transport keeps one list per priority step
+PRIORITY_SEPARATOR = '\x06\x16'
+PRIORITY_STEPS = (0, 3, 6, 9)
+
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PUBLISHED = Counter('celery_tasks_published_total', 'Tasks sent to the broker.', ('task',))
+QUEUE_DELAY = Histogram(
+    'celery_task_queue_delay_seconds', 'Time between publishing and the start of execution.', ('task',),
+    buckets=TASK_BUCKETS,
+)
+DURATION = Histogram(
+    'celery_task_duration_seconds', 'Task execution time by final state.', ('task', 'state'),
+    buckets=TASK_BUCKETS,
+)
+OUTCOMES = Counter('celery_task_outcomes_total', 'Finished tasks by final state.', ('task', 'state'))
+RETRIES = Counter('celery_task_retries_total', 'Task retries.', ('task',))
+QUEUE_LENGTH = Gauge('celery_queue_length', 'Messages waiting in the broker queue.', ('queue',))
+
+_started = {}
+
+
+def task_published(sender=None, headers=None, **kwargs):
+    if headers is not None:
+        headers[PUBLISHED_AT_HEADER] = time.time()
+    PUBLISHED.labels(task=sender).inc()
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    now = time.time()
+    published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+    if published_at is not None:
+        QUEUE_DELAY.labels(task=task.name).observe(max(now - published_at, 0))
+    _started[task_id] = time.perf_counter()
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    start = _started.pop(task_id, None)
+    if start is not None:
+        DURATION.labels(task=task.name, state=state).observe(time.perf_counter() - start)
+    OUTCOMES.labels(task=task.name, state=state).inc()
+
+
+def task_retried(sender=None, **kwargs):
+    RETRIES.labels(task=sender.name).inc()
+
+
+def queue_length(client, queue):
+    keys = [queue] + ['{}{}{}'.format(queue, PRIORITY_SEPARATOR, step) for step in PRIORITY_STEPS[1:]]
+    pipeline = client.pipeline(transaction=False)
+    for key in keys:
+        pipeline.llen(key)
+    return sum(pipeline.execute())
+
+
+def sample_queue_lengths(queues, interval):
+    client = redis.Redis.from_url(
+        settings.CELERY_BROKER_URL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    )
+    while True:
+        for queue in queues:
+            try:
+                QUEUE_LENGTH.labels(queue=queue).set(queue_length(client, queue))
+            except redis.RedisError:
+                pass
+        time.sleep(interval)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE_LATEST)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_worker_telemetry(sender=None, **kwargs):
+    """
+    Start the broker queue sampler and the /metrics exporter of a worker.
+    Task metrics are recorded where tasks run, so run the worker with the
+    threads (or solo) pool for them to reach this exporter.
+    """
+    from main_project.celery import app, app_queues
+
+    if settings.CELERY_BROKER_URL.startswith(('redis://', 'rediss://')):
+        queues = {app.conf.task_default_queue, settings.CELERY_PRIO_QUEUE}
+        queues.update(app_queues)
+        threading.Thread(
+            target=sample_queue_lengths,
+            args=(sorted(queues), settings.CELERY_QUEUE_SAMPLE_INTERVAL),
+            daemon=True,
+        ).start()
+    server = HTTPServer(('0.0.0.0', settings.CELERY_METRICS_PORT), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import redis
+from django.conf import settings
+from django.db import connections
+from django_redis.pool import ConnectionFactory
+
+
+_redis_pool = None
+_redis_client = None
+_lock = threading.Lock()
+
+
+def get_redis_pool():
+    global _redis_pool
+    if _redis_pool is None:
+        with _lock:
+            if _redis_pool is None:
+                _redis_pool = redis.BlockingConnectionPool.from_url(
+                    settings.REDIS_URL,
+                    **settings.REDIS_POOL_OPTIONS
+                )
+    return _redis_pool
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(connection_pool=get_redis_pool())
+    return _redis_client
+
+
+class SharedConnectionFactory(ConnectionFactory):
+    """
+    django_redis connection factory that hands out the process-wide pool
+    for REDIS_URL, so the cache and the OTP store share connections.
+    """
+    def get_or_create_connection_pool(self, params):
+        if params['url'] == settings.REDIS_URL:
+            return get_redis_pool()
+        return super().get_or_create_connection_pool(params)
+
+
+def redis_pool_stats():
+    if _redis_pool is None:
+        return {'max': settings.REDIS_POOL_OPTIONS['max_connections'], 'created': 0, 'idle': 0, 'in_use': 0}
+    created = len(_redis_pool._connections)
+    idle = len([connection for connection in list(_redis_pool.pool.queue) if connection is not None])
+    return {
+        'max': _redis_pool.max_connections,
+        'created': created,
+        'idle': idle,
+        'in_use': created - idle,
+    }
+
+
+def database_stats():
+    stats = {}
+    for conn in connections.all():
+        stats[conn.alias] = {
+            'open': conn.connection is not None,
+            'max_age': conn.settings_dict['CONN_MAX_AGE'],
+        }
+    return stats
+
+
+def check_database_connections(**kwargs):
+    """
+    Ping persistent connections that have been idle for longer than
+    DATABASE_HEALTH_CHECK_INTERVAL and drop the broken ones, so a request
+    never starts on a connection the server has already closed.
+    """
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None:
+            continue
+        checked_at = getattr(conn, 'health_checked_at', 0)
+        if now - checked_at < settings.DATABASE_HEALTH_CHECK_INTERVAL:
+            continue
+        conn.health_checked_at = now
+        if not conn.is_usable():
+            conn.close()
+
+
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def async_pool_options():
+    # REDIS_POOL_OPTIONS without what only the blocking sync pool takes;
+    # bench and test settings swap in fakeredis's async connection class
+    options = dict(settings.REDIS_POOL_OPTIONS)
+    options.pop('timeout', None)
+    options.pop('connection_class', None)
+    connection_class = getattr(settings, 'REDIS_ASYNC_CONNECTION_CLASS', None)
+    if connection_class is not None:
+        options['connection_class'] = connection_class
+    return options
+
+
+def get_async_redis():
+    """
+    redis.asyncio connections are bound to the event loop that opened them,
+    so keep one client per loop: a single one under an ASGI server, one per
+    request when async views are served through WSGI, which then closes it
+    with close_async_redis().
+    """
+    from redis import asyncio as aioredis
+
+    loop = asyncio.get_event_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool.from_url(settings.REDIS_URL, **async_pool_options())
+        )
+        _async_redis_clients[loop] = client
+    return client
+
+
+async def close_async_redis():
+    # the loop of a request served through WSGI ends with the request
+    client = _async_redis_clients.pop(asyncio.get_event_loop(), None)
+    if client is not None:
+        await client.connection_pool.disconnect()
@@ -0,0 +1,143 @@
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connections
+
+from main_project.connections import get_redis, get_async_redis
+from main_project.middleware import HybridMiddleware
+
+
+PIN_COOKIE = 'primary_pin'
+
+_state = Local()
+_lag_cache = {}
+
+
+def pin_key(user_id):
+    return 'primary_pin:{}'.format(user_id)
+
+
+def pin_to_primary(user=None):
+    """
+    Send the rest of this request's reads to the primary and keep the
+    user's reads there for REPLICA_STICKY_SECONDS, so they read their
+    own writes while the replicas catch up.
+    """
+    _state.pinned = True
+    _state.wrote = True
+    if user is not None and settings.DATABASE_REPLICAS:
+        get_redis().set(pin_key(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def pin_recent_writer(user_id):
+    """
+    Pin the rest of the request to the primary when `user_id` wrote within
+    REPLICA_STICKY_SECONDS, from any client. Called by the authentication
+    class once it has the token payload, so no token is decoded for routing.
+    """
+    if getattr(_state, 'in_request', False) and not getattr(_state, 'pinned', False):
+        if get_redis().exists(pin_key(user_id)):
+            _state.pinned = True
+
+
+def replica_lag(alias):
+    checked_at, lag = _lag_cache.get(alias, (0, 0))
+    now = time.monotonic()
+    if now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+    conn = connections[alias]
+    try:
+        if conn.vendor == 'postgresql':
+            with conn.cursor() as cursor:
+                # the last replay timestamp stops moving while the primary
+                # is idle, a replica that has replayed all it received is current
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0'
+                    ' ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+                )
+                lag = float(cursor.fetchone()[0])
+        else:
+            lag = 0
+    except Exception:
+        lag = float('inf')
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    ]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'pinned', False):
+            return 'default'
+        replicas = healthy_replicas()
+        if not replicas:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # reads after a write in the same request must see it
+        if getattr(_state, 'in_request', False):
+            _state.pinned = True
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class PrimaryPinMiddleware(HybridMiddleware):
+    """
+    Sends a request's reads to a replica until it writes, whatever its
+    method, and to the primary after that. A client holding the pin
+    cookie reads from the primary throughout; a user who wrote from
+    another client is pinned on authentication, see pin_recent_writer().
+    """
+    def call(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        self.start(request)
+        try:
+            return self.finish(self.get_response(request))
+        finally:
+            self.reset()
+
+    async def acall(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        self.start(request)
+        try:
+            return self.finish(await self.get_response(request))
+        finally:
+            self.reset()
+
+    def start(self, request):
+        _state.in_request = True
+        _state.pinned = PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+
+    def finish(self, response):
+        if _state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def reset(self):
+        _state.in_request = False
+        _state.pinned = False
+        _state.wrote = False
@@ -0,0 +1,72 @@
+import gc
+import multiprocessing
+import os
+import shutil
+
+from decouple import config
+
+
+# io: threaded sync workers for the DB/Redis bound API (default)
+# cpu: one process per core for hashing heavy traffic
+# async: uvicorn workers serving main_project.asgi
+WORKLOAD = config('GUNICORN_WORKLOAD', default='io')
+CORES = multiprocessing.cpu_count()
+
+if WORKLOAD == 'async':
+    default_workers, default_threads = CORES, 1
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'main_project.asgi:application'
+elif WORKLOAD == 'cpu':
+    default_workers, default_threads = CORES + 1, 1
+    worker_class = 'sync'
+    wsgi_app = 'main_project.wsgi:application'
+else:
+    default_workers, default_threads = CORES * 2 + 1, 4
+    worker_class = 'gthread'
+    wsgi_app = 'main_project.wsgi:application'
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = config('GUNICORN_WORKERS', default=default_workers, cast=int)
+threads = config('GUNICORN_THREADS', default=default_threads, cast=int)
+preload_app = True
+timeout = config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = 30
+keepalive = 5
+max_requests = config('GUNICORN_MAX_REQUESTS', default=5000, cast=int)
+max_requests_jitter = max_requests // 10
+worker_tmp_dir = '/dev/shm'
+accesslog = '-'
+
+# prometheus_client reads this when it is first imported, before the app
+# is preloaded: the workers then keep their metrics in files there, which
+# /metrics merges whichever worker answers the scrape
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/dev/shm/prometheus')
+
+
+def on_starting(server):
+    # files left by the workers of a previous run would be counted again
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+
+def when_ready(server):
+    from main_project.warmup import warm_up
+
+    warm_up()
+    # keep the preloaded heap out of the collector so that gc passes in
+    # the workers do not touch, and therefore copy, the shared pages
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # drops the live gauges of the worker, its counters stay in the totals
+    multiprocess.mark_process_dead(worker.pid)
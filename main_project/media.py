@@ -0,0 +1,166 @@
+"""
+Media delivery. Django resolves and authorizes the path and sets the
+cache headers, the bytes are sent by the front server:
+
+    MEDIA_DELIVERY=x-accel-redirect
+        an empty response with X-Accel-Redirect, nginx sends the file
+        (including range requests) from an internal location:
+
+            location /protected-media/ {
+                internal;
+                alias /usr/src/app/;
+            }
+
+    MEDIA_DELIVERY=sendfile
+        a FileResponse, which the server hands to wsgi.file_wrapper and
+        sends with sendfile(2), with single byte ranges. Like the static()
+        route it replaces, it only answers with DEBUG on, production
+        serves media through nginx or not at all.
+
+MEDIA_AUTHORIZATION is the dotted path of a callable (request, path)
+returning whether the request may read `path` (relative to MEDIA_ROOT,
+e.g. media/09120000000/avatar.jpg). Refused files answer 404, and with
+a callable set responses are only cached privately. Without one every
+upload is public, as avatars always were.
+"""
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+
+
+# name.<hash>.ext, as written by hashed storages and asset pipelines
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,64}\.\w+$')
+IMMUTABLE_MAX_AGE = 31536000
+# a single range, multipart/byteranges is not worth it for avatars
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# MEDIA_ROOT is the project directory, uploads go to its media/ folder
+# (see get_img_upload_path) and nothing else under it is served
+UPLOAD_DIRS = ('media/',)
+
+
+def get_etag(stat):
+    # nginx's format, so validators match whichever of the two answered
+    return '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+
+def cache_control(path, private=False):
+    scope = 'private' if private else 'public'
+    if HASHED_NAME.search(path):
+        return '{}, max-age={}, immutable'.format(scope, IMMUTABLE_MAX_AGE)
+    return '{}, max-age={}'.format(scope, settings.MEDIA_CACHE_MAX_AGE)
+
+
+@lru_cache(maxsize=None)
+def get_authorization(dotted_path):
+    return import_string(dotted_path) if dotted_path else None
+
+
+def parse_range(header, size):
+    """
+    Return (first, last) byte of a single-range Range header, None to send
+    the whole file (no header, or one this does not handle), and raise
+    ValueError when the range is unsatisfiable.
+    """
+    match = BYTE_RANGE.match(header or '')
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # suffix range, the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(media_file, first, length, block_size=FileResponse.block_size):
+    with media_file:
+        media_file.seek(first)
+        while length > 0:
+            chunk = media_file.read(min(block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, full_path, stat, etag):
+    """FileResponse for the file, or the part of it a Range header asks for."""
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None or if_range in (etag, http_date(stat.st_mtime)):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(stat.st_size)
+            return response
+
+    media_file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(media_file)
+    else:
+        first, last = byte_range
+        if last == stat.st_size - 1:
+            # runs to the end of the file, so it can still go to sendfile()
+            media_file.seek(first)
+            response = FileResponse(media_file, status=206)
+        else:
+            response = StreamingHttpResponse(read_range(media_file, first, last - first + 1), status=206)
+            response['Content-Type'] = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, stat.st_size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    if settings.MEDIA_DELIVERY != 'x-accel-redirect' and not settings.DEBUG:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    if not path.startswith(UPLOAD_DIRS) or any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    authorize = get_authorization(settings.MEDIA_AUTHORIZATION)
+    if authorize is not None and not authorize(request, path):
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = get_etag(stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        if settings.MEDIA_DELIVERY == 'x-accel-redirect':
+            content_type, encoding = mimetypes.guess_type(full_path)
+            response = HttpResponse(content_type=content_type or 'application/octet-stream')
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + filepath_to_uri(path)
+        else:
+            response = file_response(request, full_path, stat, etag)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control(path, private=authorize is not None)
+    return response
@@ -0,0 +1,158 @@
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.functional import empty
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from main_project.connections import redis_pool_stats
+from main_project.middleware import HybridMiddleware
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ('method', 'route', 'status'),
+    buckets=DEFAULT_BUCKETS,
+)
+SPAN_DURATION = Histogram(
+    'http_span_duration_seconds', 'Time spent per request in db, redis, jwt, hash and profanity.', ('route', 'span'),
+    buckets=DEFAULT_BUCKETS,
+)
+SPAN_CALLS = Counter(
+    'http_span_calls_total', 'Calls per request span (queries, redis commands, ...).', ('route', 'span'),
+)
+# summed over the live worker processes
+REDIS_POOL = Gauge(
+    'redis_pool_connections', 'Shared Redis pool connections.', ('state',), multiprocess_mode='livesum',
+)
+
+
+def collect_redis_pool():
+    for state, value in redis_pool_stats().items():
+        REDIS_POOL.labels(state=state).set(value)
+
+
+def render():
+    """
+    Every process counts in memory of its own, so with several gunicorn
+    workers a scrape would only see the worker that answered it. With
+    PROMETHEUS_MULTIPROC_DIR set (gunicorn_conf sets it) prometheus_client
+    keeps the values in one file per process there instead, and this
+    merges them into one exposition.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+_request = Local()
+
+
+@contextmanager
+def timed(span):
+    spans = getattr(_request, 'spans', None)
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration, calls = spans.get(span, (0, 0))
+        spans[span] = (duration + time.perf_counter() - start, calls + 1)
+
+
+def time_query(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(connection, **kwargs):
+    # installed on every connection rather than around each request, under
+    # ASGI the queries run on connections of sync_to_async threads
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+connection_created.connect(install_query_timer)
+
+
+def may_see_timings(request):
+    """
+    Whether the response may carry Server-Timing: for METRICS_ALLOWED_IPS
+    and staff only, since span timings tell outsiders things such as
+    whether a login reached the password hasher, i.e. the account exists.
+    """
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    # a session user nobody has loaded is not loaded just for the header
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return False
+    return user.is_staff
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Times the database, Redis, JWT, password hashing and profanity spans of
+    each request, feeds the per-route histograms served at /metrics and,
+    for allowed clients, reports the spans in a Server-Timing header.
+    """
+    def call(self, request):
+        _request.spans = {}
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            spans = _request.spans
+        finally:
+            _request.spans = None
+        return self.report(request, response, spans, time.perf_counter() - start)
+
+    async def acall(self, request):
+        _request.spans = {}
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            spans = _request.spans
+        finally:
+            _request.spans = None
+        return self.report(request, response, spans, time.perf_counter() - start)
+
+    def report(self, request, response, spans, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        REQUEST_DURATION.labels(method=request.method, route=route, status=response.status_code).observe(duration)
+        collect_redis_pool()
+        timings = []
+        for span, (span_duration, calls) in spans.items():
+            SPAN_DURATION.labels(route=route, span=span).observe(span_duration)
+            SPAN_CALLS.labels(route=route, span=span).inc(calls)
+            timings.append('{};dur={:.2f};desc="{} calls"'.format(span, span_duration * 1000, calls))
+        if may_see_timings(request):
+            timings.append('total;dur={:.2f}'.format(duration * 1000))
+            response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,38 @@
+import asyncio
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # asgiref < 3.6, the last releases for Python 3.6
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI.
+
+    Django passes an async get_response when the rest of the chain is
+    async; the instance then marks itself as a coroutine function and
+    __call__ hands over to acall(), so no sync_to_async hop is added
+    around it. Subclasses implement call() and acall().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
@@ -0,0 +1,151 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+from main_project.connections import get_redis
+from main_project.middleware import HybridMiddleware
+
+
+TOGGLE_KEY = 'profiling:sample_rate'
+SIGNING_SALT = 'main_project.profiling'
+
+_toggle = {'rate': 0.0, 'checked_at': 0.0}
+_task_profilers = {}
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread: a daemon thread snapshots the
+    target thread's stack every `interval` seconds and counts identical
+    stacks, which is the collapsed-stack format flamegraph.pl and
+    speedscope read.
+    """
+    def __init__(self, thread_id, interval=None):
+        self.thread_id = thread_id
+        self.interval = interval or settings.PROFILING_INTERVAL
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join('{} {}\n'.format(stack, count) for stack, count in self.stacks.most_common())
+
+
+def sign_profile_request():
+    return signing.dumps('profile', salt=SIGNING_SALT)
+
+
+def is_signed(value):
+    try:
+        signing.loads(value, salt=SIGNING_SALT, max_age=settings.PROFILING_SIGNATURE_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def set_sample_rate(rate, timeout):
+    get_redis().set(TOGGLE_KEY, rate, timeout)
+
+
+def toggled_sample_rate():
+    # read the admin toggle at most every PROFILING_TOGGLE_CHECK_INTERVAL seconds
+    now = time.monotonic()
+    if now - _toggle['checked_at'] >= settings.PROFILING_TOGGLE_CHECK_INTERVAL:
+        _toggle['checked_at'] = now
+        try:
+            _toggle['rate'] = float(get_redis().get(TOGGLE_KEY) or 0)
+        except Exception:
+            _toggle['rate'] = 0.0
+    return _toggle['rate']
+
+
+def should_profile(signature=None):
+    if signature is not None:
+        return is_signed(signature)
+    rate = max(settings.PROFILING_SAMPLE_RATE, toggled_sample_rate())
+    return rate > 0 and random.random() < rate
+
+
+def save_profile(label, profiler):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    name = '{}-{}-{}.collapsed'.format(
+        time.strftime('%Y%m%dT%H%M%S'),
+        uuid.uuid4().hex[:8],
+        re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')[:80],
+    )
+    with open(os.path.join(settings.PROFILING_DIR, name), 'w') as profile_file:
+        profile_file.write(profiler.collapsed())
+    return name
+
+
+def list_profiles():
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    return sorted(os.listdir(settings.PROFILING_DIR), reverse=True)
+
+
+def open_profile(name):
+    return open(os.path.join(settings.PROFILING_DIR, name), 'rb')
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    def call(self, request):
+        if not should_profile(request.META.get('HTTP_X_PROFILE')):
+            return self.get_response(request)
+        profiler = SamplingProfiler(threading.get_ident()).start()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.stop()
+            save_profile('{} {}'.format(request.method, request.path), profiler)
+
+    async def acall(self, request):
+        if not should_profile(request.META.get('HTTP_X_PROFILE')):
+            return await self.get_response(request)
+        # samples the event loop thread, code run through sync_to_async
+        # shows up as the await it is waiting in
+        profiler = SamplingProfiler(threading.get_ident()).start()
+        try:
+            return await self.get_response(request)
+        finally:
+            profiler.stop()
+            save_profile('{} {}'.format(request.method, request.path), profiler)
+
+
+def profile_task_start(task_id=None, task=None, **kwargs):
+    if should_profile(getattr(task.request, 'profile', None)):
+        _task_profilers[task_id] = SamplingProfiler(threading.get_ident()).start()
+
+
+def profile_task_end(task_id=None, task=None, **kwargs):
+    profiler = _task_profilers.pop(task_id, None)
+    if profiler is not None:
+        profiler.stop()
+        save_profile(task.name, profiler)
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+from django.contrib.sessions.models import Session
+
+
+class SessionStore(CacheSessionStore):
+    """
+    Redis session store.
+
+    Sessions are kept as compact serialized strings with a Redis TTL. The
+    expiry slides: once less than half of the session age is left on the
+    key the session is marked modified, so SessionMiddleware saves it and
+    renews the cookie.
+    With SESSION_REDIS_WRITE_THROUGH the database table is kept in sync and
+    used as a fallback for sessions that are not in Redis yet.
+    """
+    cache_key_prefix = 'session:'
+
+    def load(self):
+        try:
+            raw, ttl = self.get_with_ttl()
+        except Exception:
+            raw = None
+        if raw is not None:
+            session_data = self.serializer().loads(raw)
+            self.slide_expiry(session_data, ttl)
+            return session_data
+        if settings.SESSION_REDIS_WRITE_THROUGH:
+            session_data = self.load_from_db()
+            if session_data is not None:
+                self.modified = True
+                return session_data
+        self._session_key = None
+        return {}
+
+    def get_with_ttl(self):
+        # the value and its remaining TTL in one round trip
+        client = self._cache.client
+        key = client.make_key(self.cache_key)
+        pipeline = client.get_client(write=False).pipeline(transaction=False)
+        pipeline.get(key)
+        pipeline.ttl(key)
+        value, ttl = pipeline.execute()
+        if value is None:
+            return None, ttl
+        return client.decode(value), ttl
+
+    def slide_expiry(self, session_data, ttl):
+        if ttl < self.get_expiry_age(expiry=session_data.get('_session_expiry')) / 2:
+            self.modified = True
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        session_data = self._get_session(no_load=must_create)
+        raw = self.serializer().dumps(session_data)
+        # unlike the stock cache backend there is no existence check
+        # before an update, it would cost one more round trip per save
+        func = self._cache.add if must_create else self._cache.set
+        result = func(self.cache_key, raw, self.get_expiry_age())
+        if must_create and not result:
+            raise CreateError
+        if settings.SESSION_REDIS_WRITE_THROUGH:
+            self.save_to_db(session_data)
+
+    def exists(self, session_key):
+        if super().exists(session_key):
+            return True
+        return settings.SESSION_REDIS_WRITE_THROUGH and Session.objects.filter(session_key=session_key).exists()
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        super().delete(session_key)
+        if session_key and settings.SESSION_REDIS_WRITE_THROUGH:
+            Session.objects.filter(session_key=session_key).delete()
+
+    def load_from_db(self):
+        session = Session.objects.filter(
+            session_key=self.session_key,
+            expire_date__gt=self.get_expiry_date(expiry=0),
+        ).first()
+        if session is None:
+            return None
+        return self.decode(session.session_data)
+
+    def save_to_db(self, session_data):
+        Session.objects.update_or_create(
+            session_key=self.session_key,
+            defaults={
+                'session_data': self.encode(session_data),
+                'expire_date': self.get_expiry_date(),
+            },
+        )
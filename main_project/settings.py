@@ -1,5 +1,4 @@
 import os
-import redis
 from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
@@ -22,16 +21,17 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'tinymce',
     'django_filters',
     'rest_framework',
     "rest_framework.authtoken",
-    "rest_framework_recaptcha",
     'authentication',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'main_project.profiling.ProfilingMiddleware',
+    'main_project.metrics.MetricsMiddleware',
+    'main_project.db_router.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +43,14 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'main_project.urls'
 
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())
+
+PROFILING_DIR = config('PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_INTERVAL = config('PROFILING_INTERVAL', default=0.005, cast=float)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_SIGNATURE_MAX_AGE = config('PROFILING_SIGNATURE_MAX_AGE', default=3600, cast=int)
+PROFILING_TOGGLE_CHECK_INTERVAL = config('PROFILING_TOGGLE_CHECK_INTERVAL', default=10, cast=int)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -69,9 +77,28 @@ DATABASES = {
         'PASSWORD': config('POSTGRES_PASSWORD'),
         'HOST': config('POSTGRES_HOST'),
         'PORT': config('POSTGRES_PORT'),
+        'CONN_MAX_AGE': config('POSTGRES_CONN_MAX_AGE', default=300, cast=int),
+        'OPTIONS': {
+            'connect_timeout': config('POSTGRES_CONNECT_TIMEOUT', default=5, cast=int),
+            'keepalives': 1,
+            'keepalives_idle': 60,
+        },
     }
 }
 
+DATABASE_HEALTH_CHECK_INTERVAL = config('DATABASE_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(config('POSTGRES_REPLICA_HOSTS', default='', cast=Csv())):
+    alias = 'replica_{}'.format(index)
+    DATABASES[alias] = dict(DATABASES['default'], HOST=replica_host, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['main_project.db_router.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5.0, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = config('REPLICA_LAG_CHECK_INTERVAL', default=5, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -98,6 +125,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
 MEDIA_ROOT = os.path.join(BASE_DIR, '')
 MEDIA_URL = '/media/'
+# sendfile only answers with DEBUG on, see main_project/media.py
+MEDIA_DELIVERY = config('MEDIA_DELIVERY', default='sendfile')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+MEDIA_AUTHORIZATION = config('MEDIA_AUTHORIZATION', default='')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -109,6 +141,17 @@ else:
     throttle_user_rate = config('PRODUCTION_THROTTLE_USER_RATE')
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'authentication.api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'authentication.api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -116,17 +159,15 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'authentication.api.authentication.PinningJSONWebTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100,
 
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'authentication.api.throttling.AnonRateThrottle',
+        'authentication.api.throttling.UserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': f'{throttle_anon_rate}/day',
@@ -134,6 +175,8 @@ REST_FRAMEWORK = {
     }
 }
 
+BASIC_AUTH_CACHE_TTL = config('BASIC_AUTH_CACHE_TTL', default=60, cast=int)
+
 JWT_AUTH = {
     'JWT_ENCODE_HANDLER': 'rest_framework_jwt.utils.jwt_encode_handler',
     'JWT_DECODE_HANDLER': 'rest_framework_jwt.utils.jwt_decode_handler',
@@ -157,33 +200,34 @@ JWT_AUTH = {
     'JWT_AUTH_COOKIE': None,
 }
 
-TINYMCE_DEFAULT_CONFIG = {
-    'plugins': "print,preview,powerpaste,casechange,importcss,tinydrive,searchreplace,autolink,autosave,save,\
-                directionality,advcode,visualblocks,visualchars,fullscreen,image,link,media,mediaembed,template,\
-                codesample,table,charmap,hr,pagebreak,nonbreaking,anchor,toc,insertdatetime,advlist,lists,checklist,\
-                wordcount,tinymcespellchecker,a11ychecker,imagetools,textpattern,noneditable,help,formatpainter,\
-                permanentpen,pageembed,charmap,tinycomments,mentions,quickbars,linkchecker,emoticons,advtable,export",
-    'theme': "silver",
-    'cleanup_on_startup': True,
-    'custom_undo_redo_levels': 10,
-}
-
 REDIS_URL = "redis://:{password}@{host}:{port}/0".format(
     password=config('REDIS_PASSWORD'),
     host=config('REDIS_HOST'),
     port=config('REDIS_PORT', cast=int)
 )
 
-REDIS = redis.Redis(
-    host=config('REDIS_HOST'),
-    port=config('REDIS_PORT', cast=int),
-    password=config('REDIS_PASSWORD'),
-    charset='utf-8',
-    decode_responses=True,
-)
+REDIS_SOCKET_TIMEOUT = config('REDIS_SOCKET_TIMEOUT', default=2.0, cast=float)
+REDIS_SOCKET_CONNECT_TIMEOUT = config('REDIS_SOCKET_CONNECT_TIMEOUT', default=2.0, cast=float)
+REDIS_HEALTH_CHECK_INTERVAL = config('REDIS_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+# one pool per process, shared by the OTP store and django_redis
+REDIS_POOL_OPTIONS = {
+    'max_connections': config('REDIS_MAX_CONNECTIONS', default=50, cast=int),
+    'timeout': config('REDIS_POOL_TIMEOUT', default=5, cast=int),
+    'socket_timeout': REDIS_SOCKET_TIMEOUT,
+    'socket_connect_timeout': REDIS_SOCKET_CONNECT_TIMEOUT,
+    'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+    'retry_on_timeout': True,
+}
 REDIS_HOST = config('REDIS_HOST')
 REDIS_PORT = config('REDIS_PORT', cast=int)
 
+# OTP and throttle keys are consistent-hashed over these nodes, see
+# main_project.sharding; set the previous list while nodes are changed
+OTP_REDIS_URLS = config('OTP_REDIS_URLS', default='', cast=Csv()) or [REDIS_URL]
+OTP_REDIS_PREVIOUS_URLS = config('OTP_REDIS_PREVIOUS_URLS', default='', cast=Csv())
+OTP_REDIS_VNODES = config('OTP_REDIS_VNODES', default=160, cast=int)
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -193,14 +237,41 @@ CACHES = {
         }
     },
 }
+DJANGO_REDIS_CONNECTION_FACTORY = 'main_project.connections.SharedConnectionFactory'
 
-CELERY_BROKER_URL = REDIS_URL
-CELERY_RESULT_BACKEND = REDIS_URL
+SESSION_ENGINE = 'main_project.sessions'
+SESSION_CACHE_ALIAS = 'default'
+SESSION_REDIS_WRITE_THROUGH = config('SESSION_REDIS_WRITE_THROUGH', default=False, cast=bool)
+
+# the broker is kept off the OTP nodes, give it its own instance in
+# production. The CELERY_BROKER / CELERY_BACKEND variables docker-compose
+# has always passed were never read and still are not, so existing .env
+# files keep the broker on REDIS_URL.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='') or REDIS_URL
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='') or CELERY_BROKER_URL
+CELERY_BROKER_POOL_LIMIT = config('CELERY_BROKER_POOL_LIMIT', default=10, cast=int)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'socket_timeout': REDIS_SOCKET_TIMEOUT,
+    'socket_connect_timeout': REDIS_SOCKET_CONNECT_TIMEOUT,
+    'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+}
+CELERY_REDIS_MAX_CONNECTIONS = config('CELERY_REDIS_MAX_CONNECTIONS', default=20, cast=int)
+CELERY_REDIS_SOCKET_TIMEOUT = REDIS_SOCKET_TIMEOUT
+CELERY_REDIS_SOCKET_CONNECT_TIMEOUT = REDIS_SOCKET_CONNECT_TIMEOUT
+CELERY_REDIS_BACKEND_HEALTH_CHECK_INTERVAL = REDIS_HEALTH_CHECK_INTERVAL
 CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_CREATE_MISSING_QUEUES = True
 CELERY_PRIO_QUEUE = 'high-priority-queue'
+CELERY_METRICS_PORT = config('CELERY_METRICS_PORT', default=9540, cast=int)
+CELERY_QUEUE_SAMPLE_INTERVAL = config('CELERY_QUEUE_SAMPLE_INTERVAL', default=15, cast=int)
+# the beat schedule itself is set up in main_project/celery.py
+AUDIT_FLUSH_INTERVAL = config('AUDIT_FLUSH_INTERVAL', default=5, cast=int)
+AUDIT_FLUSH_BATCH_SIZE = config('AUDIT_FLUSH_BATCH_SIZE', default=5000, cast=int)
+AUDIT_FLUSH_LOCK_TIMEOUT = config('AUDIT_FLUSH_LOCK_TIMEOUT', default=60, cast=int)
+AUDIT_RETENTION_MONTHS = config('AUDIT_RETENTION_MONTHS', default=12, cast=int)
+AUDIT_PARTITIONS_AHEAD = config('AUDIT_PARTITIONS_AHEAD', default=2, cast=int)
 
 SMS_API_KEY = config('SMS_API_KEY')
 SMS_PHONE_NUMBER = config('SMS_PHONE_NUMBER')
@@ -0,0 +1,188 @@
+"""
+Consistent hashing of the OTP and throttle keyspace over the Redis nodes
+in OTP_REDIS_URLS. Each key is placed by a shard key (the mobile number
+for OTPs), so adding a node moves only about 1/N of the keys.
+
+While OTP_REDIS_PREVIOUS_URLS holds the node list from before a change,
+a read that misses on the new owner falls back to the old one and moves
+the key over (read-repair), and deletes go to both. Once the longest TTL
+has passed, or after the rebalance_otp_keys command, the previous list
+can be dropped.
+"""
+import asyncio
+import bisect
+import hashlib
+import threading
+import weakref
+from urllib.parse import urlparse
+
+import redis
+from django.conf import settings
+
+from main_project.connections import async_pool_options, get_redis_pool
+
+
+def node_name(url):
+    # the password is left out, rotating it must not move keys
+    parsed = urlparse(url)
+    return '{}:{}{}'.format(parsed.hostname, parsed.port or 6379, parsed.path or '/0')
+
+
+def hash_key(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    def __init__(self, urls, vnodes=None):
+        vnodes = vnodes or settings.OTP_REDIS_VNODES
+        self.urls = list(urls)
+        points = sorted(
+            (hash_key('{}#{}'.format(node_name(url), index)), url)
+            for url in self.urls
+            for index in range(vnodes)
+        )
+        self.hashes = [point for point, url in points]
+        self.owners = [url for point, url in points]
+
+    def get_url(self, shard_key):
+        index = bisect.bisect(self.hashes, hash_key(str(shard_key))) % len(self.hashes)
+        return self.owners[index]
+
+
+def sync_client(url):
+    if url == settings.REDIS_URL:
+        return redis.Redis(connection_pool=get_redis_pool())
+    return redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(url, **settings.REDIS_POOL_OPTIONS))
+
+
+def async_client(url):
+    from redis import asyncio as aioredis
+
+    return aioredis.Redis(connection_pool=aioredis.ConnectionPool.from_url(url, **async_pool_options()))
+
+
+class BaseShardedRedis:
+    def __init__(self, urls, previous_urls=(), vnodes=None, client_factory=sync_client):
+        self.ring = HashRing(urls, vnodes)
+        self.previous_ring = HashRing(previous_urls, vnodes) if previous_urls else None
+        self.clients = {url: client_factory(url) for url in set(urls) | set(previous_urls)}
+
+    def client_for(self, shard_key):
+        return self.clients[self.ring.get_url(shard_key)]
+
+    def previous_client_for(self, shard_key):
+        # the node that owned the key before the last change, if another one
+        if self.previous_ring is None:
+            return None
+        url = self.previous_ring.get_url(shard_key)
+        if url == self.ring.get_url(shard_key):
+            return None
+        return self.clients[url]
+
+
+class ShardedRedis(BaseShardedRedis):
+    def get(self, key, shard_key):
+        value = self.client_for(shard_key).get(key)
+        previous = self.previous_client_for(shard_key)
+        if value is None and previous is not None:
+            pipeline = previous.pipeline(transaction=False)
+            pipeline.get(key)
+            pipeline.pttl(key)
+            value, ttl = pipeline.execute()
+            if value is not None:
+                # nx: a value written to the new owner meanwhile is newer
+                if not self.client_for(shard_key).set(key, value, px=ttl if ttl > 0 else None, nx=True):
+                    value = self.client_for(shard_key).get(key)
+                previous.delete(key)
+        return value
+
+    def set(self, key, value, shard_key, ex=None):
+        return self.client_for(shard_key).set(key, value, ex=ex)
+
+    def delete(self, key, shard_key):
+        # a consumed OTP left on the old node would be read-repaired back
+        previous = self.previous_client_for(shard_key)
+        if previous is not None:
+            previous.delete(key)
+        return self.client_for(shard_key).delete(key)
+
+    def execute(self, commands):
+        """
+        Run (shard_key, method, args) commands with one pipeline per node
+        and return the results in the order of `commands`.
+        """
+        by_url = {}
+        for position, (shard_key, method, args) in enumerate(commands):
+            by_url.setdefault(self.ring.get_url(shard_key), []).append((position, method, args))
+        results = [None] * len(commands)
+        for url, node_commands in by_url.items():
+            pipeline = self.clients[url].pipeline(transaction=False)
+            for position, method, args in node_commands:
+                getattr(pipeline, method)(*args)
+            for (position, method, args), result in zip(node_commands, pipeline.execute()):
+                results[position] = result
+        return results
+
+
+class AsyncShardedRedis(BaseShardedRedis):
+    def __init__(self, urls, previous_urls=(), vnodes=None):
+        super().__init__(urls, previous_urls, vnodes, client_factory=async_client)
+
+    async def get(self, key, shard_key):
+        value = await self.client_for(shard_key).get(key)
+        previous = self.previous_client_for(shard_key)
+        if value is None and previous is not None:
+            pipeline = previous.pipeline(transaction=False)
+            pipeline.get(key)
+            pipeline.pttl(key)
+            value, ttl = await pipeline.execute()
+            if value is not None:
+                if not await self.client_for(shard_key).set(key, value, px=ttl if ttl > 0 else None, nx=True):
+                    value = await self.client_for(shard_key).get(key)
+                await previous.delete(key)
+        return value
+
+    async def set(self, key, value, shard_key, ex=None):
+        return await self.client_for(shard_key).set(key, value, ex=ex)
+
+    async def delete(self, key, shard_key):
+        previous = self.previous_client_for(shard_key)
+        if previous is not None:
+            await previous.delete(key)
+        return await self.client_for(shard_key).delete(key)
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.connection_pool.disconnect()
+
+
+_otp_redis = None
+_otp_lock = threading.Lock()
+_async_otp_redis = weakref.WeakKeyDictionary()
+
+
+def get_otp_redis():
+    global _otp_redis
+    if _otp_redis is None:
+        with _otp_lock:
+            if _otp_redis is None:
+                _otp_redis = ShardedRedis(settings.OTP_REDIS_URLS, settings.OTP_REDIS_PREVIOUS_URLS)
+    return _otp_redis
+
+
+def get_async_otp_redis():
+    # one set of clients per event loop, as in get_async_redis, and closed
+    # the same way by close_async_otp_redis()
+    loop = asyncio.get_event_loop()
+    client = _async_otp_redis.get(loop)
+    if client is None:
+        client = _async_otp_redis[loop] = AsyncShardedRedis(
+            settings.OTP_REDIS_URLS, settings.OTP_REDIS_PREVIOUS_URLS
+        )
+    return client
+
+
+async def close_async_otp_redis():
+    client = _async_otp_redis.pop(asyncio.get_event_loop(), None)
+    if client is not None:
+        await client.close()
@@ -0,0 +1,29 @@
+"""
+Settings for the test suite, which `manage.py test` picks by default:
+the SQLite, fakeredis and in-memory broker setup of bench_settings, plus
+a second database the routing tests use as a replica.
+"""
+from .bench_settings import *
+
+
+BENCHMARK = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+    # only read from when a test sets DATABASE_REPLICAS
+    'replica_0': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+DATABASE_REPLICAS = []
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# the worker the celery metrics tests start polls memory:// once a second
+# otherwise, and would route Django's request warnings to the test output
+CELERY_BROKER_TRANSPORT_OPTIONS = {'polling_interval': 0.01}
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
@@ -1,13 +1,16 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from main_project.media import serve_media
+from main_project.metrics import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/authentication/', include('authentication.api.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
     
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
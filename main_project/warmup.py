@@ -0,0 +1,35 @@
+from django.db import connections
+from django.urls import get_resolver
+
+
+def warm_up():
+    """
+    Build everything that is otherwise built lazily on the first request,
+    so it happens once in the preloading master and is shared with the
+    forked workers.
+    """
+    import kavenegar
+    from rest_framework_jwt.settings import api_settings
+    from django.contrib.auth.hashers import get_hashers
+
+    from authentication.api import serializers
+    from authentication.api.utils import get_profanity
+
+    get_resolver().url_patterns
+    get_resolver()._populate()
+    api_settings.JWT_ENCODE_HANDLER
+    api_settings.JWT_DECODE_HANDLER
+    api_settings.JWT_PAYLOAD_HANDLER
+    get_hashers()
+    get_profanity()
+    for serializer_class in (
+        serializers.SendOtpSerializer,
+        serializers.VerifyOtpSerializer,
+        serializers.UserSignUpSerializer,
+        serializers.LogInByPasswordSerializer,
+        serializers.UpdateProfileSerializer,
+    ):
+        serializer_class().fields
+
+    # nothing opened while warming up may be inherited by the workers
+    connections.close_all()
@@ -4,7 +4,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hokubit_proj.settings')
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main_project.test_settings')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main_project.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,4 @@
+python manage.py makemigrations authentication --noinput
+python manage.py migrate
+python manage.py audit_partitions
+python manage.py collectstatic --no-input --clear
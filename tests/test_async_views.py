@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.test import AsyncClient, TestCase
+
+from authentication.models import User, AuthAuditEvent
+from authentication.audit import BUFFER_KEY
+from main_project.connections import get_redis
+from main_project.sharding import get_otp_redis
+
+
+class AsyncOtpViewTests(TestCase):
+    """
+    The async OTP endpoints against fakeredis, and their answers next to
+    the sync views', which share the account and OTP checks with them.
+    """
+    mobile = '09120000000'
+
+    def setUp(self):
+        get_redis().flushdb()
+        self.user = User.objects.create_user(
+            mobile=self.mobile,
+            email='async@example.com',
+            username='async_user',
+            password='async_user',
+        )
+        patcher = mock.patch('authentication.tasks.kavenegar_sms_task.apply_async')
+        self.sms = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, path, data, client=None, **params):
+        return (client or self.client).post(path, data, content_type='application/json', **params)
+
+    def send_otp(self, prefix='/api/authentication/async/'):
+        response = self.post(prefix + 'send_otp/?has_account=1', {'mobile': self.mobile})
+        self.assertEqual(response.status_code, 201)
+        return str(self.sms.call_args[1]['args'][1])
+
+    def assert_same_answer(self, path, data, query=''):
+        sync = self.post('/api/authentication/{}/{}'.format(path, query), data)
+        asynchronous = self.post('/api/authentication/async/{}/{}'.format(path, query), data)
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        self.assertEqual(asynchronous.json(), sync.json())
+
+    def test_send_otp_stores_the_code(self):
+        otp = self.send_otp()
+        stored = get_otp_redis().get('otp:' + self.mobile, shard_key=self.mobile)
+        self.assertEqual(stored.decode(), otp)
+
+    def test_validate_otp(self):
+        otp = self.send_otp()
+        response = self.post('/api/authentication/async/validate_otp/', {'mobile': self.mobile, 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_by_otp_returns_a_token_and_consumes_the_code(self):
+        otp = self.send_otp()
+        response = self.post('/api/authentication/async/login_by_otp/', {'mobile': self.mobile, 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('JWT token', response.json())
+        self.assertIsNone(get_otp_redis().get('otp:' + self.mobile, shard_key=self.mobile))
+
+    def test_failures_are_audited(self):
+        self.send_otp()
+        self.post('/api/authentication/async/validate_otp/', {'mobile': self.mobile, 'otp': '00000'})
+        self.assertEqual(get_redis().llen(BUFFER_KEY), 2)
+        self.assertIn(AuthAuditEvent.OTP_FAILED.encode(), get_redis().lindex(BUFFER_KEY, -1))
+
+    def test_send_otp_account_checks_match_the_sync_view(self):
+        self.assert_same_answer('send_otp', {'mobile': self.mobile})
+        self.assert_same_answer('send_otp', {'mobile': '09129999999'}, query='?has_account=1')
+
+    def test_login_checks_match_the_sync_view(self):
+        otp = self.send_otp()
+        self.assert_same_answer('login_by_otp', {'mobile': '09129999999', 'otp': otp})
+        self.assert_same_answer('login_by_otp', {'mobile': self.mobile, 'otp': '00000'})
+        self.assert_same_answer('validate_otp', {'mobile': self.mobile, 'otp': '00000'})
+        User.objects.filter(pk=self.user.pk).update(status=User.BLOCKED_STATUS)
+        self.assert_same_answer('login_by_otp', {'mobile': self.mobile, 'otp': otp})
+
+    def test_invalid_input_matches_the_sync_view(self):
+        self.assert_same_answer('validate_otp', {'mobile': 'x', 'otp': '1'})
+        self.assert_same_answer('login_by_otp', {'mobile': self.mobile})
+
+    def test_non_object_body_is_a_bad_request(self):
+        response = self.post('/api/authentication/async/login_by_otp/', [1, 2])
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_post_is_allowed(self):
+        self.assertEqual(self.client.get('/api/authentication/async/send_otp/').status_code, 405)
+
+    async def test_served_through_asgi(self):
+        client = AsyncClient()
+        response = await client.post(
+            '/api/authentication/async/send_otp/', {'mobile': '09121111111'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
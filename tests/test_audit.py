@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from prometheus_client import REGISTRY
+from redis.exceptions import ConnectionError
+
+from authentication.audit import (
+    BUFFER_KEY,
+    FLUSH_LOCK_KEY,
+    PROCESSING_KEY,
+    build_event,
+    create_table,
+    flush_events,
+)
+from authentication.models import AuthAuditEvent, User
+from main_project.connections import get_redis
+
+
+def dropped(event):
+    return REGISTRY.get_sample_value('auth_audit_events_dropped_total', {'event': event}) or 0
+
+
+class RecordEventTests(TestCase):
+
+    def setUp(self):
+        get_redis().flushdb()
+        self.user = User.objects.create_user(
+            mobile='09120000020',
+            email='audit@example.com',
+            username='audited',
+            password='audited',
+        )
+
+    def login(self):
+        return self.client.post('/api/authentication/login_by_password/', {
+            'mobile_or_email_or_username': 'audited', 'password': 'audited',
+        }, content_type='application/json')
+
+    def test_login_is_buffered(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertIn(AuthAuditEvent.LOGIN_PASSWORD.encode(), get_redis().lindex(BUFFER_KEY, -1))
+
+    def test_login_succeeds_when_redis_is_down(self):
+        before = dropped(AuthAuditEvent.LOGIN_PASSWORD)
+        with mock.patch('redis.Redis.rpush', side_effect=ConnectionError('down')), \
+                self.assertLogs('authentication.audit', 'WARNING'):
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('JWT token', response.json())
+        self.assertEqual(dropped(AuthAuditEvent.LOGIN_PASSWORD), before + 1)
+
+    def test_async_otp_succeeds_when_redis_is_down(self):
+        before = dropped(AuthAuditEvent.OTP_SENT)
+        with mock.patch('authentication.tasks.kavenegar_sms_task.apply_async'), \
+                mock.patch('redis.asyncio.Redis.rpush', side_effect=ConnectionError('down')), \
+                self.assertLogs('authentication.audit', 'WARNING'):
+            response = self.client.post(
+                '/api/authentication/async/send_otp/', {'mobile': '09120000021'}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(dropped(AuthAuditEvent.OTP_SENT), before + 1)
+
+
+@override_settings(AUDIT_FLUSH_BATCH_SIZE=2)
+class FlushEventsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the table is not managed by migrations, and SQLite cannot create
+        # it inside the test case's transaction
+        create_table()
+        super().setUpClass()
+
+    def setUp(self):
+        self.redis = get_redis()
+        self.redis.flushdb()
+
+    def buffer(self, count, event=AuthAuditEvent.OTP_SENT):
+        for index in range(count):
+            self.redis.rpush(BUFFER_KEY, build_event(event, identifier=str(index)))
+
+    def test_buffered_events_are_written_in_batches(self):
+        self.buffer(5)
+        self.assertEqual(flush_events(), 5)
+        self.assertEqual(AuthAuditEvent.objects.count(), 5)
+        self.assertEqual(self.redis.llen(BUFFER_KEY), 0)
+        self.assertFalse(self.redis.exists(PROCESSING_KEY))
+
+    def test_leftover_batch_is_written_first(self):
+        # what a run that crashed before its INSERT committed leaves behind
+        self.redis.rpush(PROCESSING_KEY, build_event(AuthAuditEvent.LOGIN_FAILED))
+        self.buffer(1)
+        self.assertEqual(flush_events(), 2)
+        self.assertEqual(
+            list(AuthAuditEvent.objects.order_by('id').values_list('event', flat=True)),
+            [AuthAuditEvent.LOGIN_FAILED, AuthAuditEvent.OTP_SENT],
+        )
+
+    def test_failed_insert_keeps_the_batch(self):
+        self.buffer(1)
+        with mock.patch.object(AuthAuditEvent.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                flush_events()
+        self.assertEqual(self.redis.llen(PROCESSING_KEY), 1)
+        self.assertFalse(self.redis.exists(FLUSH_LOCK_KEY))
+        self.assertEqual(flush_events(), 1)
+
+    def test_only_one_run_flushes_at_a_time(self):
+        self.buffer(1)
+        lock = self.redis.lock(FLUSH_LOCK_KEY, timeout=60)
+        lock.acquire()
+        self.assertEqual(flush_events(), 0)
+        lock.release()
+        self.assertEqual(flush_events(), 1)
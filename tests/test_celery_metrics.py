@@ -0,0 +1,137 @@
+import time
+from unittest import mock
+
+import fakeredis
+from celery.contrib.testing.worker import start_worker
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+
+from main_project import celery_metrics
+from main_project.celery import app
+from main_project.celery_metrics import PRIORITY_SEPARATOR, PUBLISHED_AT_HEADER
+
+
+@app.task(bind=True, name='tests.published_at')
+def published_at(self):
+    return getattr(self.request, PUBLISHED_AT_HEADER, None)
+
+
+@app.task(bind=True, name='tests.flaky', max_retries=1)
+def flaky(self):
+    if not self.request.retries:
+        raise self.retry(countdown=0)
+    return self.request.retries
+
+
+@app.task(name='tests.broken')
+def broken():
+    raise ValueError('broken')
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def settled(name, expected, **labels):
+    """The sample once it reaches `expected`: task_postrun fires after the result is stored."""
+    deadline = time.monotonic() + 5
+    while sample(name, **labels) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return sample(name, **labels)
+
+
+class TaskMetricsTests(SimpleTestCase):
+    """Tasks published to the memory:// broker and run by an in-process worker."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # the app reads Django's namespaced settings, bench_settings runs tasks eagerly
+        app.conf.CELERY_TASK_ALWAYS_EAGER = False
+        # the worker's /metrics exporter is not needed here
+        cls.http_server = mock.patch('main_project.celery_metrics.HTTPServer')
+        cls.http_server.start()
+        cls.worker = start_worker(app, pool='solo', perform_ping_check=False)
+        cls.worker.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.__exit__(None, None, None)
+        cls.http_server.stop()
+        app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        super().tearDownClass()
+
+    def test_publishing_stamps_the_time(self):
+        before = time.time()
+        stamped = published_at.delay().get(timeout=10)
+        self.assertGreaterEqual(stamped, before)
+        self.assertLessEqual(stamped, time.time())
+
+    def test_publish_hook_sets_the_header(self):
+        headers = {}
+        celery_metrics.task_published(sender='tests.hook', headers=headers)
+        self.assertAlmostEqual(headers[PUBLISHED_AT_HEADER], time.time(), delta=1)
+        self.assertEqual(sample('celery_tasks_published_total', task='tests.hook'), 1)
+
+    def test_queue_delay_is_observed_from_the_header(self):
+        count = sample('celery_task_queue_delay_seconds_count', task='tests.published_at')
+        published_at.delay().get(timeout=10)
+        self.assertEqual(sample('celery_task_queue_delay_seconds_count', task='tests.published_at'), count + 1)
+
+    def test_queue_delay_is_time_from_publish_to_start(self):
+        task = mock.Mock()
+        task.name = 'tests.delay'
+        setattr(task.request, PUBLISHED_AT_HEADER, time.time() - 3)
+        celery_metrics.task_started(task_id='delay', task=task)
+        celery_metrics._started.pop('delay')
+        delay = sample('celery_task_queue_delay_seconds_sum', task='tests.delay')
+        self.assertAlmostEqual(delay, 3, delta=0.5)
+
+    def test_duration_and_outcome_of_a_success(self):
+        labels = {'task': 'tests.published_at', 'state': 'SUCCESS'}
+        count = sample('celery_task_duration_seconds_count', **labels)
+        outcomes = sample('celery_task_outcomes_total', **labels)
+        published_at.delay().get(timeout=10)
+        self.assertEqual(settled('celery_task_duration_seconds_count', count + 1, **labels), count + 1)
+        self.assertEqual(settled('celery_task_outcomes_total', outcomes + 1, **labels), outcomes + 1)
+
+    def test_failure_is_counted_by_state(self):
+        labels = {'task': 'tests.broken', 'state': 'FAILURE'}
+        outcomes = sample('celery_task_outcomes_total', **labels)
+        # keeps the worker's traceback out of the test output
+        with self.assertRaises(ValueError), mock.patch('celery.app.trace.logger'):
+            broken.delay().get(timeout=10)
+        self.assertEqual(settled('celery_task_outcomes_total', outcomes + 1, **labels), outcomes + 1)
+        self.assertEqual(settled('celery_task_duration_seconds_count', outcomes + 1, **labels), outcomes + 1)
+
+    def test_retries_are_counted(self):
+        retries = sample('celery_task_retries_total', task='tests.flaky')
+        retried = sample('celery_task_outcomes_total', task='tests.flaky', state='RETRY')
+        self.assertEqual(flaky.delay().get(timeout=10), 1)
+        self.assertEqual(sample('celery_task_retries_total', task='tests.flaky'), retries + 1)
+        self.assertEqual(settled('celery_task_outcomes_total', retried + 1, task='tests.flaky', state='RETRY'), retried + 1)
+
+
+@override_settings(CELERY_BROKER_URL='redis://broker:6379/0')
+class QueueLengthTests(SimpleTestCase):
+    """The queue sampler against a fake broker Redis."""
+
+    def setUp(self):
+        self.broker = fakeredis.FakeRedis()
+        self.broker.rpush('celery', 'a', 'b')
+        self.broker.rpush('celery' + PRIORITY_SEPARATOR + '3', 'c')
+        self.broker.rpush('celery' + PRIORITY_SEPARATOR + '9', 'd')
+        self.broker.rpush('other', 'e')
+
+    def test_length_adds_up_the_priority_lists(self):
+        self.assertEqual(celery_metrics.queue_length(self.broker, 'celery'), 4)
+        self.assertEqual(celery_metrics.queue_length(self.broker, 'empty'), 0)
+
+    def test_sampler_sets_the_gauge(self):
+        with mock.patch('redis.Redis.from_url', return_value=self.broker), \
+                mock.patch('main_project.celery_metrics.time') as clock:
+            clock.sleep.side_effect = StopIteration
+            with self.assertRaises(StopIteration):
+                celery_metrics.sample_queue_lengths(['celery', 'other'], 15)
+        self.assertEqual(sample('celery_queue_length', queue='celery'), 4)
+        self.assertEqual(sample('celery_queue_length', queue='other'), 1)
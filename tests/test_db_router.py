@@ -0,0 +1,127 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from authentication.api.authentication import JWT_AUTHENTICATION
+from authentication.api.utils import token_generator
+from authentication.models import User
+from main_project import db_router
+from main_project.connections import get_redis
+from main_project.db_router import PIN_COOKIE, PrimaryPinMiddleware, pin_key
+
+
+@api_view(['GET'])
+@authentication_classes(JWT_AUTHENTICATION)
+@permission_classes((AllowAny,))
+def read_view(request):
+    return Response({'db': User.objects.all().db})
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class PrimaryReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica_0'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # replication is not simulated, the replica only gets the table
+        replica = connections['replica_0']
+        if User._meta.db_table not in replica.introspection.table_names():
+            with replica.schema_editor() as schema_editor:
+                schema_editor.create_model(User)
+
+    def setUp(self):
+        get_redis().flushdb()
+        db_router._lag_cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            mobile='09120000001',
+            email='routing@example.com',
+            username='routing',
+            password='routing',
+        )
+
+    def route(self, request, write=False):
+        """Pass `request` through PrimaryPinMiddleware, return where reads went before and after the view's write."""
+        seen = {}
+
+        def view(request):
+            seen['before'] = User.objects.all().db
+            if write:
+                self.user.save()
+                seen['after'] = User.objects.all().db
+            return HttpResponse()
+
+        response = PrimaryPinMiddleware(view)(request)
+        return seen, response
+
+    def test_reads_outside_a_request_go_to_the_replica(self):
+        self.assertEqual(User.objects.all().db, 'replica_0')
+        self.assertEqual(router.db_for_write(User), 'default')
+
+    def test_get_reads_from_the_replica(self):
+        seen, response = self.route(self.factory.get('/'))
+        self.assertEqual(seen['before'], 'replica_0')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_post_reads_from_the_replica_until_it_writes(self):
+        seen, response = self.route(self.factory.post('/'), write=True)
+        self.assertEqual(seen['before'], 'replica_0')
+        self.assertEqual(seen['after'], 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_read_only_post_sets_no_pin(self):
+        seen, response = self.route(self.factory.post('/'))
+        self.assertEqual(seen['before'], 'replica_0')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_pin_cookie_reads_from_the_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        seen, _ = self.route(request)
+        self.assertEqual(seen['before'], 'default')
+
+    def test_state_does_not_leak_into_the_next_request(self):
+        self.route(self.factory.post('/'), write=True)
+        seen, _ = self.route(self.factory.get('/'))
+        self.assertEqual(seen['before'], 'replica_0')
+
+    def test_recent_writer_reads_from_the_primary_on_another_client(self):
+        get_redis().set(pin_key(self.user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+        request = self.factory.get('/', HTTP_AUTHORIZATION='JWT {}'.format(token_generator(self.user)))
+        response = PrimaryPinMiddleware(read_view)(request)
+        self.assertEqual(response.data['db'], 'default')
+
+    def test_other_users_read_from_the_replica(self):
+        # the row as replicated
+        User.objects.using('replica_0').bulk_create([self.user])
+        request = self.factory.get('/', HTTP_AUTHORIZATION='JWT {}'.format(token_generator(self.user)))
+        response = PrimaryPinMiddleware(read_view)(request)
+        self.assertEqual(response.data['db'], 'replica_0')
+
+    def test_lagging_replica_is_skipped(self):
+        db_router._lag_cache['replica_0'] = (time.monotonic(), settings.REPLICA_MAX_LAG + 1)
+        seen, _ = self.route(self.factory.get('/'))
+        self.assertEqual(seen['before'], 'default')
+
+    def test_send_otp_existence_check_reads_from_the_replica(self):
+        with mock.patch('authentication.tasks.kavenegar_sms_task.apply_async'), \
+                CaptureQueriesContext(connections['replica_0']) as replica_queries, \
+                CaptureQueriesContext(connections['default']) as primary_queries:
+            response = self.client.post(
+                '/api/authentication/send_otp/?has_account=1',
+                {'mobile': '09120000002'},
+                content_type='application/json',
+            )
+        # the replica has no rows, so the mobile is reported unknown
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(replica_queries), 1)
+        self.assertEqual(len(primary_queries), 0)
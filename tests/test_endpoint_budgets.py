@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from authentication.management.commands.bench_endpoints import (
+    BUDGETS,
+    Command,
+    count_redis_round_trips,
+    over_budget,
+)
+from main_project.connections import get_redis
+
+
+class EndpointBudgetTests(TestCase):
+    """The bench_endpoints request mix, failing when an endpoint goes over its budget."""
+
+    def setUp(self):
+        get_redis().flushdb()
+
+    def test_endpoints_stay_within_budget(self):
+        command = Command()
+        # more users than a user_list page, so an N+1 shows
+        command.seed(30)
+        samples, _ = command.measure(3)
+        self.assertEqual(set(samples), set(BUDGETS))
+        self.assertEqual(over_budget(samples), [])
+
+    def test_overrun_is_reported(self):
+        samples = {'user_list': {'db': BUDGETS['user_list']['db'] + 10, 'redis': 0}}
+        self.assertEqual(len(over_budget(samples)), 1)
+
+    def test_cache_traffic_is_counted(self):
+        with count_redis_round_trips() as calls:
+            cache.set('budget', 1)
+            cache.get('budget')
+        self.assertEqual(calls['round_trips'], 2)
+
+    def test_pipeline_is_one_round_trip(self):
+        pipeline = get_redis().pipeline()
+        pipeline.set('budget', 1)
+        pipeline.get('budget')
+        with count_redis_round_trips() as calls:
+            pipeline.execute()
+        self.assertEqual(calls['round_trips'], 1)
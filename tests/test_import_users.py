@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from authentication.models import User
+
+
+class ImportUsersTests(TestCase):
+
+    def import_lines(self, lines, **options):
+        handle, path = tempfile.mkstemp(suffix='.ndjson')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as stream:
+            stream.write('\n'.join(lines) + '\n')
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_users', path, workers=0, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_rows_are_imported_with_profiles(self):
+        stdout, _ = self.import_lines([json.dumps({
+            'mobile': '09120000010', 'email': 'import@example.com', 'username': 'imported', 'password': 'secret',
+        })])
+        user = User.objects.get(username='imported')
+        self.assertTrue(user.check_password('secret'))
+        self.assertTrue(hasattr(user, 'profile'))
+        self.assertIn('1 users imported, 0 skipped', stdout)
+
+    def test_lines_that_are_not_objects_are_rejected(self):
+        stdout, stderr = self.import_lines([
+            '[1, 2]',
+            '"x"',
+            json.dumps({
+                'mobile': '09120000011', 'email': 'kept@example.com', 'username': 'kept', 'password': 'secret',
+            }),
+        ])
+        self.assertTrue(User.objects.filter(username='kept').exists())
+        self.assertIn('1 users imported, 2 skipped', stdout)
+        self.assertIn('rejected [1, 2]: not an object', stderr)
+        self.assertIn('rejected "x": not an object', stderr)
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from main_project.media import HASHED_NAME
+
+
+PATH = 'media/09120000000/avatar.jpg'
+HASHED_PATH = 'media/09120000000/avatar.3f2a9c1be0.jpg'
+SIZE = 64 * 1024
+
+
+def deny_hashed(request, path):
+    # MEDIA_AUTHORIZATION for the tests, refuses content-hashed names
+    return not HASHED_NAME.search(path)
+
+
+class RecordingFileWrapper:
+    # stands in for the server's wsgi.file_wrapper, which would sendfile()
+    wrapped = []
+
+    def __init__(self, filelike, block_size=8192):
+        self.filelike = filelike
+        self.wrapped.append(filelike)
+
+    def __iter__(self):
+        return iter(())
+
+    def close(self):
+        self.filelike.close()
+
+
+class MediaTestCase(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.media_root, 'media', '09120000000'))
+        for name in (PATH, HASHED_PATH, 'media/.hidden', 'settings.py'):
+            with open(os.path.join(cls.media_root, name), 'wb') as media_file:
+                media_file.write(os.urandom(SIZE))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+@override_settings(MEDIA_DELIVERY='x-accel-redirect')
+class XAccelRedirectTests(MediaTestCase):
+
+    def test_nginx_sends_the_file(self):
+        response = self.client.get('/media/' + PATH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], settings.MEDIA_ACCEL_PREFIX + PATH)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_validators_answer_304(self):
+        response = self.client.get('/media/' + PATH)
+        not_modified = self.client.get('/media/' + PATH, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        not_modified = self.client.get('/media/' + PATH, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_only_hashed_names_are_immutable(self):
+        self.assertNotIn('immutable', self.client.get('/media/' + PATH)['Cache-Control'])
+        self.assertTrue(self.client.get('/media/' + HASHED_PATH)['Cache-Control'].endswith('immutable'))
+
+    def test_paths_outside_media_are_not_served(self):
+        for forbidden in ('media/../settings.py', 'settings.py', 'media/.hidden'):
+            with self.subTest(forbidden):
+                self.assertEqual(self.client.get('/media/' + forbidden).status_code, 404)
+
+
+@override_settings(MEDIA_DELIVERY='x-accel-redirect', MEDIA_AUTHORIZATION=__name__ + '.deny_hashed')
+class AuthorizationTests(MediaTestCase):
+
+    def test_refused_file_answers_404(self):
+        self.assertEqual(self.client.get('/media/' + HASHED_PATH).status_code, 404)
+
+    def test_allowed_file_is_only_cached_privately(self):
+        response = self.client.get('/media/' + PATH)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+
+
+@override_settings(MEDIA_DELIVERY='sendfile', DEBUG=True)
+class SendfileTests(MediaTestCase):
+
+    def get(self, path, **headers):
+        """Run the WSGI handler with RecordingFileWrapper as wsgi.file_wrapper."""
+        request = RequestFactory().get('/media/' + path, **headers)
+        RecordingFileWrapper.wrapped = []
+        environ = dict(request.environ, **{'wsgi.file_wrapper': RecordingFileWrapper})
+        statuses = []
+        body = WSGIHandler()(environ, lambda status, headers: statuses.append((status, dict(headers))))
+        self.addCleanup(body.close)
+        status, headers = statuses[0]
+        return status, headers, body
+
+    def test_file_goes_to_the_file_wrapper(self):
+        status, headers, body = self.get(PATH)
+        self.assertTrue(status.startswith('200'))
+        self.assertIsInstance(body, RecordingFileWrapper)
+        # Django read no bytes of the file
+        self.assertEqual(RecordingFileWrapper.wrapped[0].tell(), 0)
+        self.assertIn('ETag', headers)
+        self.assertIn('Last-Modified', headers)
+        self.assertEqual(headers['Accept-Ranges'], 'bytes')
+
+    def test_open_ended_range(self):
+        status, headers, body = self.get(PATH, HTTP_RANGE='bytes=1000-')
+        self.assertTrue(status.startswith('206'))
+        self.assertEqual(headers['Content-Range'], 'bytes 1000-{}/{}'.format(SIZE - 1, SIZE))
+        self.assertEqual(headers['Content-Length'], str(SIZE - 1000))
+        # the rest of the file still goes to the file wrapper, from the range start
+        self.assertIsInstance(body, RecordingFileWrapper)
+        self.assertEqual(RecordingFileWrapper.wrapped[0].tell(), 1000)
+
+    def test_bounded_range_sends_only_its_bytes(self):
+        status, headers, body = self.get(PATH, HTTP_RANGE='bytes=0-99')
+        self.assertTrue(status.startswith('206'))
+        self.assertEqual(len(b''.join(body)), 100)
+        self.assertEqual(headers['Content-Length'], '100')
+
+    def test_suffix_range(self):
+        _, headers, _ = self.get(PATH, HTTP_RANGE='bytes=-10')
+        self.assertEqual(headers['Content-Range'], 'bytes {}-{}/{}'.format(SIZE - 10, SIZE - 1, SIZE))
+
+    def test_range_past_the_end_answers_416(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            status, headers, _ = self.get(PATH, HTTP_RANGE='bytes={}-'.format(SIZE))
+        self.assertTrue(status.startswith('416'))
+        self.assertEqual(headers['Content-Range'], 'bytes */{}'.format(SIZE))
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        status, _, _ = self.get(PATH, HTTP_RANGE='bytes=0-99', HTTP_IF_RANGE='"stale"')
+        self.assertTrue(status.startswith('200'))
+
+    @override_settings(DEBUG=False)
+    def test_not_served_with_debug_off(self):
+        self.assertEqual(self.client.get('/media/' + PATH).status_code, 404)
@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from authentication.api.utils import token_generator
+from authentication.models import User
+from main_project.connections import get_redis
+
+
+class ServerTimingTests(TestCase):
+    """Server-Timing only reaches METRICS_ALLOWED_IPS and staff."""
+    outside = '10.0.0.1'
+
+    def setUp(self):
+        get_redis().flushdb()
+        self.user = User.objects.create_user(
+            mobile='09120000003',
+            email='timing@example.com',
+            username='timing',
+            password='timing',
+        )
+
+    def login(self, username, **params):
+        return self.client.post('/api/authentication/login_by_password/', {
+            'mobile_or_email_or_username': username, 'password': 'wrong',
+        }, content_type='application/json', **params)
+
+    def test_allowed_ip_gets_the_spans(self):
+        response = self.login(self.user.username)
+        self.assertIn('hash;', response['Server-Timing'])
+
+    def test_login_from_outside_does_not_tell_whether_the_account_exists(self):
+        for username in (self.user.username, 'nobody'):
+            response = self.login(username, REMOTE_ADDR=self.outside)
+            self.assertNotIn('Server-Timing', response)
+
+    def test_staff_gets_the_spans_from_anywhere(self):
+        token = 'JWT {}'.format(token_generator(self.user))
+        path = '/api/authentication/profile/{}/'.format(self.user.slug)
+        response = self.client.get(path, HTTP_AUTHORIZATION=token, REMOTE_ADDR=self.outside)
+        self.assertNotIn('Server-Timing', response)
+
+        User.objects.filter(pk=self.user.pk).update(is_admin=True)
+        response = self.client.get(path, HTTP_AUTHORIZATION=token, REMOTE_ADDR=self.outside)
+        self.assertIn('total;', response['Server-Timing'])
+
+    def test_metrics_are_refused_outside_the_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR=self.outside).status_code, 403)
@@ -0,0 +1,90 @@
+from collections import Counter
+
+import fakeredis
+from django.test import SimpleTestCase
+
+from authentication.management.commands.rebalance_otp_keys import rebalance
+from main_project.sharding import ShardedRedis
+
+
+NODES = ['redis://shard-{}:6379/0'.format(index) for index in range(3)]
+NEW_NODE = 'redis://shard-new:6379/0'
+MOBILES = ['0912{:07d}'.format(index) for index in range(3000)]
+
+
+class ShardingTests(SimpleTestCase):
+    """
+    OTP keys spread over fakeredis nodes, one explicit FakeServer per URL:
+    left to itself fakeredis may put every URL on one server.
+    """
+
+    def setUp(self):
+        self.servers = {url: fakeredis.FakeServer() for url in NODES + [NEW_NODE]}
+        self.before = self.sharded(NODES)
+        # one pipeline per node for the whole batch
+        self.before.execute([(mobile, 'set', ('otp:' + mobile, mobile[-5:], 600)) for mobile in MOBILES])
+        self.after = self.sharded(NODES + [NEW_NODE], previous_urls=NODES)
+        self.moved = [
+            mobile for mobile in MOBILES if self.after.ring.get_url(mobile) != self.before.ring.get_url(mobile)
+        ]
+
+    def sharded(self, urls, previous_urls=()):
+        return ShardedRedis(
+            urls, previous_urls, client_factory=lambda url: fakeredis.FakeRedis(server=self.servers[url]),
+        )
+
+    def test_keys_are_spread_over_the_nodes(self):
+        counts = Counter(self.before.ring.get_url(mobile) for mobile in MOBILES)
+        self.assertEqual(set(counts), set(NODES))
+        self.assertLess(max(counts.values()), 1.5 * len(MOBILES) / len(NODES))
+        for url in NODES:
+            self.assertEqual(self.before.clients[url].dbsize(), counts[url])
+
+    def test_keys_only_move_to_the_new_node(self):
+        self.assertTrue(self.moved)
+        self.assertLess(len(self.moved), len(MOBILES) / 2)
+        self.assertTrue(all(self.after.ring.get_url(mobile) == NEW_NODE for mobile in self.moved))
+
+    def test_moved_keys_are_repaired_on_read(self):
+        mobile = self.moved[0]
+        self.assertEqual(self.after.get('otp:' + mobile, shard_key=mobile), mobile[-5:].encode())
+        self.assertEqual(self.after.clients[NEW_NODE].get('otp:' + mobile), mobile[-5:].encode())
+        self.assertIsNone(self.after.clients[self.before.ring.get_url(mobile)].get('otp:' + mobile))
+        self.assertGreater(self.after.clients[NEW_NODE].ttl('otp:' + mobile), 0)
+
+    def test_new_owners_value_wins(self):
+        mobile = self.moved[0]
+        # an OTP sent after the change went to the new owner
+        self.after.set('otp:' + mobile, 'newer', shard_key=mobile)
+        self.assertEqual(self.after.get('otp:' + mobile, shard_key=mobile), b'newer')
+
+    def test_lost_race_returns_the_new_owners_value(self):
+        mobile = self.moved[0]
+        new_owner = self.after.clients[NEW_NODE]
+        real_set = new_owner.set
+
+        def set_after_a_concurrent_send(*args, **kwargs):
+            # another request stores a fresh OTP between the GET and the repair
+            real_set('otp:' + mobile, 'newer')
+            return real_set(*args, **kwargs)
+
+        new_owner.set = set_after_a_concurrent_send
+        self.assertEqual(self.after.get('otp:' + mobile, shard_key=mobile), b'newer')
+
+    def test_deleted_otp_is_not_repaired_back(self):
+        mobile = self.moved[0]
+        self.after.delete('otp:' + mobile, shard_key=mobile)
+        self.assertIsNone(self.after.get('otp:' + mobile, shard_key=mobile))
+
+    def test_rebalance_moves_every_key_to_its_owner(self):
+        consumed = self.moved[0]
+        self.after.delete('otp:' + consumed, shard_key=consumed)
+        rebalance(self.after)
+        current = self.sharded(NODES + [NEW_NODE])
+        values = current.execute([(mobile, 'get', ('otp:' + mobile,)) for mobile in MOBILES])
+        missing = [mobile for mobile, value in zip(MOBILES, values) if value is None and mobile != consumed]
+        self.assertEqual(missing, [])
+        self.assertIsNone(current.get('otp:' + consumed, shard_key=consumed))
+        # moved keys keep their expiry
+        ttls = current.execute([(mobile, 'ttl', ('otp:' + mobile,)) for mobile in self.moved[1:]])
+        self.assertTrue(all(0 < ttl <= 600 for ttl in ttls))
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+from unittest import TestCase
+
+from authentication.management.commands._startup_probe import ImportTimer
+
+
+class ImportTimerTests(TestCase):
+    def test_times_nested_imports(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'probe_outer.py'), 'w') as module:
+                module.write('import time\nimport probe_inner\ntime.sleep(0.01)\n')
+            with open(os.path.join(directory, 'probe_inner.py'), 'w') as module:
+                module.write('import time\ntime.sleep(0.02)\n')
+            timer = ImportTimer()
+            sys.path.insert(0, directory)
+            sys.meta_path.insert(0, timer)
+            try:
+                import probe_outer  # noqa: F401
+            finally:
+                sys.meta_path.remove(timer)
+                sys.path.remove(directory)
+                sys.modules.pop('probe_outer', None)
+                sys.modules.pop('probe_inner', None)
+
+        times = {name: (cumulative, own) for cumulative, own, name in timer.imports}
+        self.assertEqual(set(times), {'probe_outer', 'probe_inner'})
+        self.assertGreaterEqual(times['probe_inner'][0], 20000)
+        self.assertGreaterEqual(times['probe_outer'][0], times['probe_inner'][0] + 10000)
+        self.assertLess(times['probe_outer'][1], times['probe_outer'][0] - times['probe_inner'][0] + 1000)